@@ -0,0 +1,99 @@
+"""Import time regression benchmark based on python -X importtime
+
+Each module is imported in a fresh interpreter. Reported are the total
+import time and the time spent outside of the import of numpy, which is
+the sum of the self times of all modules not imported by numpy. Also
+reported is any heavy optional dependency that was imported although the
+module does not need it at import time.
+
+Budgets are relative to the import time of numpy alone, measured in the
+same run, so that they do not depend on the speed of the machine. All
+times are the best of [repeats] runs.
+
+With --check, exits with status 1 if a module exceeds its budget or
+imports a heavy dependency. Otherwise, the results are only reported.
+
+Usage:
+    python benchmarks/bench_import_time.py [--check] [repeats]
+"""
+import subprocess
+import sys
+
+# Modules checked, with budget for the import time outside of numpy as
+# fraction of the import time of numpy
+BUDGETS = {
+    "upylib": 0.05,
+    # Imports functools, threading and contextlib, which numpy imports anyway
+    "upylib.instrumentation": 0.15,
+    "upylib.phys_chem.air_humidity": 0.1,
+    "upylib.phys_chem.water_glycol_density_c_th": 0.1,
+    "upylib.phys_chem.wheatstone_rtd_pt100_pt1000": 0.1,
+    "upylib.sensors.kty81_1xx_sensor_generate_lut": 0.1,
+    # These import logging, json or datetime
+    "upylib.phys_chem.pressure_loss": 0.3,
+    "upylib.phys_chem.pipe_network": 0.4,
+    "upylib.phys_chem.parameter_sweep": 0.4,
+    "upylib.devices.rth1004": 0.5,
+    "upylib.devices.capture_archive": 0.5,
+    # Imports sqlite3
+    "upylib.devices.capture_catalog": 0.6,
+    "upylib.plot_utils.multi_axes": 0.4,
+}
+# Dependencies which must only be imported on first use
+HEAVY = ("scipy", "matplotlib", "mpl_toolkits", "fluids", "numba", "pandas")
+
+
+def import_times(module: str) -> tuple[float, float, set]:
+    """Total import time and import time outside of numpy in ms, and the
+    names of all imported top-level packages, from one run of
+    python -X importtime"""
+    # The marker separates the imports done at interpreter startup
+    code = f"import sys; print('MARK', file=sys.stderr); import {module}"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, check=True)
+    # Entries are (self time, nesting depth, name), nested imports are
+    # listed before the module importing them
+    entries = []
+    lines = result.stderr.splitlines()
+    for line in lines[lines.index("MARK") + 1:]:
+        if not line.startswith("import time:"):
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        depth = len(name) - len(name.lstrip()) - 1
+        entries.append((int(self_us) / 1000, depth, name.strip()))
+    total = sum(self_ms for self_ms, _, _ in entries)
+    numpy_ms = 0.0
+    for i, (self_ms, depth, name) in enumerate(entries):
+        if name == "numpy":
+            numpy_ms += self_ms
+            j = i - 1
+            while j >= 0 and entries[j][1] > depth:
+                numpy_ms += entries[j][0]
+                j -= 1
+    packages = {name.split(".")[0] for _, _, name in entries}
+    return total, total - numpy_ms, packages
+
+def main(repeats: int, check: bool):
+    numpy_ms = min(import_times("numpy")[0] for _ in range(repeats))
+    print(f"numpy alone: {numpy_ms:.1f} ms")
+    print(f"{'module':48} {'total ms':>9} {'own ms':>7} {'budget':>7}  heavy")
+    failed = False
+    for module, budget in BUDGETS.items():
+        runs = [import_times(module) for _ in range(repeats)]
+        total = min(run[0] for run in runs)
+        own = min(run[1] for run in runs)
+        heavy = sorted(runs[0][2].intersection(HEAVY))
+        budget_ms = budget * numpy_ms
+        ok = own <= budget_ms and not heavy
+        failed |= not ok
+        print(f"{module:48} {total:9.1f} {own:7.1f} {budget_ms:7.1f}  "
+              f"{', '.join(heavy)}{'' if ok else '  OVER BUDGET'}")
+    return 1 if failed and check else 0
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    check = "--check" in args
+    args = [arg for arg in args if arg != "--check"]
+    sys.exit(main(int(args[0]) if args else 5, check))
@@ -0,0 +1,49 @@
+"""Benchmark RTH1004_DATA.read_csv against the former np.genfromtxt parser
+
+Usage:
+    python benchmarks/bench_read_csv.py [record_length ...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from upylib.devices.rth1004 import RTH1004_DATA
+from synthetic import write_rth1004_csv
+
+
+def read_csv_genfromtxt(filename: str) -> np.ndarray:
+    """Sample block parser as used by read_csv before the fast loader"""
+    with open(filename, "rt") as f:
+        for _ in range(20):
+            next(f)
+        return np.genfromtxt(f, delimiter=";", skip_header=2)
+
+def best_of(n: int, func, *args) -> float:
+    times = []
+    for _ in range(n):
+        t_start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - t_start)
+    return min(times)
+
+def main(record_lengths):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for record_length in record_lengths:
+            filename = os.path.join(tmpdir, f"rth1004_{record_length}.csv")
+            write_rth1004_csv(filename, record_length)
+            reference = read_csv_genfromtxt(filename)
+            scope_data = RTH1004_DATA(filename)
+            assert np.array_equal(scope_data.samples_raw, reference)
+            t_ref = best_of(3, read_csv_genfromtxt, filename)
+            t_new = best_of(3, RTH1004_DATA, filename)
+            print(f"record_length: {record_length:>9}   "
+                  f"genfromtxt: {t_ref:8.4f} s   "
+                  f"read_csv: {t_new:8.4f} s   "
+                  f"speedup: {t_ref / t_new:5.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
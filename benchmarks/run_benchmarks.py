@@ -0,0 +1,344 @@
+"""Benchmark suite for the hot paths of upylib
+
+Every benchmark is a setup function registered with @benchmark, taking the
+problem size and returning the function to time and the number of items
+(samples, elements, calls) it processes. All input data is generated
+from fixed seeds, see synthetic.py.
+
+For each benchmark and size, the best of several runs is reported as time
+per run and throughput in items per second, together with the peak of
+memory allocated during one run, as traced by tracemalloc (this includes
+numpy arrays).
+
+Usage:
+    python benchmarks/run_benchmarks.py [options] [name_filter ...]
+
+Options:
+    --large             Include RTH1004 captures of 1e7 samples
+    --repeats N         Number of timed runs, default 5
+    --json FILE         Save results as JSON
+    --compare FILE      Compare with results saved before and mark the
+                        benchmarks slower by more than --threshold
+    --threshold RATIO   Default 1.25
+    --check             Exit with status 1 if any benchmark is marked
+                        slower. Timings on a busy machine vary by more
+                        than the threshold, so this is off by default.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from synthetic import (write_rth1004_csv, reynolds_sweep, climate_log,
+                       rtd_bridge_voltages)
+
+BENCHMARKS = []
+RECORD_LENGTHS = (10_000, 100_000, 1_000_000)
+RECORD_LENGTHS_LARGE = (10_000_000,)
+
+
+def benchmark(*sizes):
+    """Registers a setup function setup(size) -> (run, n_items)"""
+    def register(setup):
+        BENCHMARKS.append((setup.__name__, setup, sizes))
+        return setup
+    return register
+
+
+######## RTH1004 captures
+_capture_files = {}
+_tmpdir = tempfile.TemporaryDirectory()
+
+def capture_file(record_length: int) -> str:
+    """Synthetic RTH1004 CSV savefile, written once per record length"""
+    if record_length not in _capture_files:
+        filename = os.path.join(_tmpdir.name, f"rth1004_{record_length}.csv")
+        write_rth1004_csv(filename, record_length)
+        _capture_files[record_length] = filename
+    return _capture_files[record_length]
+
+def capture(record_length: int):
+    from upylib.devices.rth1004 import RTH1004_DATA
+    return RTH1004_DATA(capture_file(record_length))
+
+@benchmark("record_lengths")
+def rth1004_read_csv(size):
+    from upylib.devices.rth1004 import RTH1004_DATA
+    filename = capture_file(size)
+    return lambda: RTH1004_DATA(filename), size
+
+@benchmark("record_lengths")
+def rth1004_read_cached(size):
+    from upylib.devices.rth1004 import RTH1004_DATA
+    filename = capture_file(size)
+    RTH1004_DATA(filename, cache=True)
+    return lambda: RTH1004_DATA(filename, cache=True), size
+
+@benchmark("record_lengths")
+def rth1004_set_viewport(size):
+    scope = capture(size)
+    t_0, t_1 = scope.time[size // 4], scope.time[size // 2]
+    def run():
+        scope.set_viewport(t_0, t_1)
+        return scope.chs_zoomed
+    return run, size // 4
+
+@benchmark("record_lengths")
+def rth1004_filter_average(size):
+    scope = capture(size)
+    return lambda: scope.filter_average(scope.ch1, 16), size
+
+@benchmark("record_lengths")
+def rth1004_time_derivative(size):
+    scope = capture(size)
+    return lambda: scope.do_time_derivative(scope.ch1, 16), size
+
+@benchmark("record_lengths")
+def rth1004_time_integral(size):
+    scope = capture(size)
+    return lambda: scope.do_time_integral(scope.ch1), size
+
+@benchmark("record_lengths")
+def rth1004_process_chs(size):
+    scope = capture(size)
+    return lambda: scope.process_chs(filter_avg=16), 4 * size
+
+@benchmark(100, 1_000, 10_000)
+def rth1004_spectrum_windows(size):
+    """Amplitude spectra of all channels over size windows of 1000 samples"""
+    scope = capture(1_000_000)
+    starts = np.linspace(0, 998_000, size).astype(int)
+    windows = np.column_stack((scope.time[starts], scope.time[starts + 999]))
+    return lambda: scope.spectrum(windows=windows), 4 * size
+
+@benchmark("record_lengths")
+def rth1004_write_archive(size):
+    from upylib.devices.capture_archive import write_archive
+    scope = capture(size)
+    filename = os.path.join(_tmpdir.name, f"rth1004_{size}.rtha")
+    return lambda: write_archive(scope, filename), size
+
+@benchmark("record_lengths")
+def rth1004_read_archive_window(size):
+    """Reads 1% of all channels from the middle of an archive"""
+    from upylib.devices.capture_archive import write_archive, CaptureArchive
+    filename = os.path.join(_tmpdir.name, f"rth1004_{size}.rtha")
+    write_archive(capture(size), filename)
+    archive = CaptureArchive(filename)
+    return lambda: archive.read(size // 2, size // 2 + size // 100), size // 100
+
+
+######## phys_chem
+@benchmark(1_000)
+def pipe_friction_lambda_scalar(size):
+    from upylib.phys_chem.pressure_loss import pipe_friction_lambda
+    Re, eD = (x.tolist() for x in reynolds_sweep(size))
+    def run():
+        for i in range(size):
+            pipe_friction_lambda(Re[i], eD[i])
+    return run, size
+
+@benchmark(10_000, 1_000_000)
+def pipe_friction_lambda_array(size):
+    from upylib.phys_chem.pressure_loss import pipe_friction_lambda
+    Re, eD = reynolds_sweep(size)
+    return lambda: pipe_friction_lambda(Re, eD), size
+
+@benchmark(20, 70)
+def pipe_network_solve(size):
+    """Grid network of size x size nodes, cold start"""
+    from upylib.phys_chem.pipe_network import PipeNetwork
+    rng = np.random.default_rng(0)
+    net = PipeNetwork()
+    for i in range(size):
+        for j in range(size):
+            for node_to in ((i + 1, j), (i, j + 1)):
+                if max(node_to) < size:
+                    net.add_segment((i, j), node_to, rng.uniform(0.5, 5),
+                                    rng.choice([10, 16, 20, 25]),
+                                    zeta=rng.uniform(0, 3))
+    net.set_pressure((0, 0), 2000)
+    net.set_pressure((size - 1, size - 1), 1000)
+    return lambda: net.solve(warm_start=False), net.n_segments
+
+@benchmark(1_000_000)
+def pipe_loss_sweep(size):
+    """Sweep of 4 parameters in chunks over all CPUs, into .npy files"""
+    from upylib.phys_chem.parameter_sweep import sweep, pipe_loss_model
+    directory = os.path.join(_tmpdir.name, "sweep")
+    n_q = size // (50 * 50 * 4)
+    def run():
+        sweep(pipe_loss_model, directory, resume=False,
+              Di_mm=np.linspace(8, 40, 50), Q_l_min=np.linspace(0.5, 60, n_q),
+              theta=np.linspace(-20, 80, 50), vol_percent=[0, 20, 40, 60])
+    return run, size
+
+@benchmark(1_000)
+def air_humidity_scalar(size):
+    from upylib.phys_chem import air_humidity
+    rh, t, p = (x.tolist() for x in climate_log(size))
+    def run():
+        for i in range(size):
+            air_humidity.air_dew_point(rh[i], t[i])
+            air_humidity.air_abs_hum_vol(rh[i], t[i])
+            air_humidity.air_x_w(rh[i], t[i], p[i])
+    return run, size
+
+@benchmark(86_400, 1_000_000)
+def air_properties(size):
+    from upylib.phys_chem.air_humidity import air_properties
+    rh, t, p = climate_log(size)
+    return lambda: air_properties(rh, t, p), size
+
+@benchmark(1_000_000)
+def rtd_bridge_temperature_fit(size):
+    from upylib.phys_chem.wheatstone_rtd_pt100_pt1000 import (
+        bridge_temperature)
+    ud = rtd_bridge_voltages(size)
+    return lambda: bridge_temperature(ud, 1.25, 1.0, 1000.0), size
+
+@benchmark(1_000_000)
+def rtd_bridge_temperature_table(size):
+    from upylib.phys_chem.wheatstone_rtd_pt100_pt1000 import (
+        bridge_temperature)
+    ud = rtd_bridge_voltages(size)
+    bridge_temperature(ud[:1], 1.25, 1.0, 1000.0, method="table")
+    return lambda: bridge_temperature(ud, 1.25, 1.0, 1000.0,
+                                      method="table"), size
+
+@benchmark(1_000_000)
+def rtd_bridge_temperature_exact(size):
+    from upylib.phys_chem.wheatstone_rtd_pt100_pt1000 import (
+        bridge_temperature)
+    ud = rtd_bridge_voltages(size)
+    return lambda: bridge_temperature(ud, 1.25, 1.0, 1000.0,
+                                      method="exact"), size
+
+@benchmark(1_000)
+def fluid_properties_scalar(size):
+    from upylib.phys_chem import water_glycol_density_c_th as fluids
+    theta = np.linspace(0, 100, size).tolist()
+    def run():
+        for x in theta:
+            fluids.rho_water(x)
+            fluids.c_th_water(x)
+    return run, size
+
+@benchmark(1_000)
+def fluid_property_table_scalar(size):
+    from upylib.phys_chem.water_glycol_density_c_th import property_table
+    rho, c_th = property_table("rho"), property_table("c_th")
+    theta = np.linspace(0, 100, size).tolist()
+    def run():
+        for x in theta:
+            rho(x)
+            c_th(x)
+    return run, size
+
+@benchmark(1_000_000)
+def fluid_properties_array(size):
+    from upylib.phys_chem import water_glycol_density_c_th as fluids
+    theta = np.random.default_rng(0).uniform(-40, 105, size)
+    def run():
+        fluids.rho_glykol60(theta)
+        fluids.c_th_glykol60(theta)
+    return run, size
+
+@benchmark(1_000_000)
+def fluid_property_table_array(size):
+    from upylib.phys_chem.water_glycol_density_c_th import property_table
+    rho, c_th = property_table("rho", 60), property_table("c_th", 60)
+    theta = np.random.default_rng(0).uniform(-40, 105, size)
+    def run():
+        rho(theta)
+        c_th(theta)
+    return run, size
+
+
+######## sensors
+@benchmark(32, 256)
+def kty81_build_lut(size):
+    """Uncached table generation, fixed-point with C code output"""
+    from upylib.sensors import kty81_1xx_sensor_generate_lut as kty81
+    def run():
+        kty81._luts.clear()
+        kty81.build_lut(table_size=size, frac_bits=4).c_code()
+    return run, size
+
+
+######## Runner
+def measure(run, repeats: int) -> tuple[float, int]:
+    """Best time of repeats in s and traced peak memory in bytes"""
+    run()
+    times = []
+    for _ in range(repeats):
+        t_start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - t_start)
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark suite for the hot paths of upylib")
+    parser.add_argument("name_filter", nargs="*")
+    parser.add_argument("--large", action="store_true")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--json")
+    parser.add_argument("--compare")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+    record_lengths = RECORD_LENGTHS + (RECORD_LENGTHS_LARGE if args.large
+                                       else ())
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    regressions = []
+    print(f"{'benchmark':40} {'size':>10} {'time/run':>12} "
+          f"{'items/s':>12} {'peak MiB':>9}" + ("   vs. base" if baseline
+                                                   else ""))
+    for name, setup, sizes in BENCHMARKS:
+        if args.name_filter and not any(f in name for f in args.name_filter):
+            continue
+        if sizes == ("record_lengths",):
+            sizes = record_lengths
+        for size in sizes:
+            key = f"{name}[{size}]"
+            run, n_items = setup(size)
+            seconds, peak = measure(run, args.repeats)
+            results[key] = {"seconds": seconds, "items": n_items,
+                            "peak_bytes": peak}
+            line = (f"{name:40} {size:10} {seconds * 1e3:9.3f} ms "
+                    f"{n_items / seconds:12.4g} {peak / 2**20:9.1f}")
+            if key in baseline:
+                ratio = seconds / baseline[key]["seconds"]
+                line += f"   {ratio:6.2f}x"
+                if ratio > args.threshold:
+                    regressions.append(key)
+                    line += "  SLOWER"
+            print(line, flush=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version, "numpy": np.__version__,
+                       "results": results}, f, indent=1)
+    if regressions:
+        print(f"{len(regressions)} benchmarks slower than "
+              f"{args.threshold}x the baseline: {', '.join(regressions)}")
+        return 1 if args.check else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
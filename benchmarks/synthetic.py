@@ -0,0 +1,96 @@
+"""Synthetic input data for the benchmarks
+
+2026-10 Ulrich Lukas
+"""
+import numpy as np
+
+RTH1004_HEADER = """\
+Model;RTH1004
+SerialNumber;103752
+Firmware Version;'1.80.3.4'
+
+Acquisition Time Stamp;2023-01-23 12:08:02.423888073;2023-01-23 12:08:02.423888073;2023-01-23 12:08:02.423888073;2023-01-23 12:08:02.423888073
+Waveform Type;ANALOG;;;
+Acquisition Mode;PEAK;;;
+Horizontal Unit;s;;;
+Horizontal Scale;{horizontal_scale:g};;;
+Horizontal Position;{horizontal_position:g};;;
+Reference Point;50 %;;;
+Sample Interval;{sample_interval:g};;;
+Record Length;{record_length};;;
+Probe Setting;'100:1';'100:1';'10:1';'0.1 V/A'
+Vertical Unit;V;V;V;A
+Vertical Scale;5;5;200;5
+Vertical Position;-1;-1;-1;1
+Vertical Offset;0;0;0;0
+History Index;0;0;0;0
+History Time Stamp;0.000000000000;0.000000000000;0.000000000000;0.000000000000
+;;;;
+TIME;CH1;CH2;CH3;CH4
+"""
+
+def rth1004_samples(record_length: int,
+                    sample_interval: float = 8e-10,
+                    horizontal_position: float = -2.504e-7,
+                    seed: int = 0
+                    ) -> np.ndarray:
+    """Noisy square wave test signals in the (N, 5) samples_raw layout"""
+    rng = np.random.default_rng(seed)
+    t_0 = horizontal_position - 0.5 * record_length * sample_interval
+    time = t_0 + np.arange(record_length) * sample_interval
+    square = np.where(np.arange(record_length) % 2000 < 1000, 1.0, 0.0)
+    samples = np.empty((record_length, 5))
+    samples[:, 0] = time
+    samples[:, 1:] = square[:, None] * [16.0, 16.0, 400.0, 5.0]
+    samples[:, 1:] += rng.normal(scale=0.2, size=(record_length, 4))
+    return samples
+
+def write_rth1004_csv(filename: str,
+                      record_length: int,
+                      sample_interval: float = 8e-10,
+                      horizontal_position: float = -2.504e-7,
+                      seed: int = 0):
+    """Write an RTH1004 CSV savefile with synthetic sample data"""
+    samples = rth1004_samples(record_length, sample_interval,
+                              horizontal_position, seed)
+    header = RTH1004_HEADER.format(
+        horizontal_scale=record_length * sample_interval / 10,
+        horizontal_position=horizontal_position,
+        sample_interval=sample_interval,
+        record_length=record_length,
+    )
+    with open(filename, "wt") as f:
+        f.write(header)
+        np.savetxt(f, samples, fmt=["%.8g"] + ["%.6g"] * 4, delimiter=";")
+
+def reynolds_sweep(n: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """Random Reynolds numbers 1e2...1e7 and relative roughness 1e-6...3e-2,
+    log-uniform distributed"""
+    rng = np.random.default_rng(seed)
+    return 10**rng.uniform(2, 7, n), 10**rng.uniform(-6, -1.5, n)
+
+def climate_log(n: int, seed: int = 0) -> tuple[np.ndarray, ...]:
+    """Relative humidity in %, temperature in °C and air pressure in hPa
+    of a 1 Hz climate log, slowly varying with noise"""
+    rng = np.random.default_rng(seed)
+    phase = 2 * np.pi * np.arange(n) / 86400
+    t = 15 - 8 * np.cos(phase) + rng.normal(scale=0.2, size=n)
+    rh = np.clip(60 + 25 * np.cos(phase) + rng.normal(scale=1, size=n),
+                 1, 100)
+    p = 1013 + rng.normal(scale=5, size=n)
+    return rh, t, p
+
+def rtd_bridge_voltages(n: int,
+                        u0: float = 1.25,
+                        nref: float = 1.0,
+                        rs1: float = 1000.0,
+                        seed: int = 0) -> np.ndarray:
+    """Bridge voltage differentials of a Pt1000 wheatstone bridge for random
+    temperatures over the range of -200°C...850°C"""
+    rng = np.random.default_rng(seed)
+    theta = rng.uniform(-200, 850, n)
+    c = np.where(theta < 0, -4.183E-12, 0.0)
+    r_x = 1000 * (1 + theta*(3.9083E-3 + theta*(-5.775E-7
+                                                + c*(theta - 100)*theta)))
+    # Inverse of wheatstone(): r_x = rs1 * (u0 + ud)/(u0*nref - ud)
+    return u0 * (nref * r_x / rs1 - 1) / (1 + r_x / rs1)
@@ -0,0 +1,42 @@
+"""Personal Python Library
+
+Subpackages, their modules and the main classes and functions are imported
+on first attribute access, e.g. upylib.phys_chem.PipeNetwork. Importing
+upylib or a single module, e.g. upylib.phys_chem.air_humidity, therefore
+does not load the dependencies of all other modules.
+"""
+from importlib import import_module
+
+
+def lazy_loader(package: str, submodules: tuple, attributes: dict = None):
+    """Returns __getattr__ and __dir__ functions for a package module
+
+    submodules are the names of submodules which are imported on first
+    access. attributes maps attribute names to the submodule defining them.
+    Loaded submodules and attributes are stored in the package namespace,
+    so that __getattr__ is only called once per name.
+    """
+    attributes = attributes or {}
+    namespace = import_module(package).__dict__
+
+    def __getattr__(name):
+        if name in submodules:
+            value = import_module(f"{package}.{name}")
+        elif name in attributes:
+            value = getattr(import_module(f"{package}.{attributes[name]}"),
+                            name)
+        else:
+            raise AttributeError(
+                f"module {package!r} has no attribute {name!r}")
+        namespace[name] = value
+        return value
+
+    def __dir__():
+        return sorted({*namespace, *submodules, *attributes})
+
+    return __getattr__, __dir__
+
+
+__getattr__, __dir__ = lazy_loader(
+    __name__, ("devices", "instrumentation", "phys_chem", "plot_utils",
+                 "sensors"))
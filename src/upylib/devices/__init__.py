@@ -0,0 +1,19 @@
+"""Data import and processing for measurement devices"""
+from upylib import lazy_loader
+
+__getattr__, __dir__ = lazy_loader(
+    __name__,
+    ("capture_archive", "capture_catalog", "rth1004",
+     "waveform_measurements", "waveform_processing", "waveform_spectral"),
+    {
+        "CaptureArchive": "capture_archive",
+        "write_archive": "capture_archive",
+        "CaptureCatalog": "capture_catalog",
+        "RTH1004_DATA": "rth1004",
+        "RTH1004_SEGMENTS": "rth1004",
+        "load_many": "rth1004",
+        "header_table": "rth1004",
+        "find_edges": "waveform_measurements",
+        "window_stats": "waveform_measurements",
+        "process_channels": "waveform_processing",
+    })
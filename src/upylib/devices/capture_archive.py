@@ -0,0 +1,363 @@
+"""Compressed archive file format for RTH1004 captures
+
+The archive stores the header attributes and the four channels, each cut
+into chunks of fixed size which are compressed independently. Reading a
+range of samples only decompresses the chunks overlapping it. Chunks are
+compressed and decompressed in parallel threads, zlib and lzma release
+the GIL while doing so.
+
+Channel samples are stored as ADC codes where possible, i.e. as integers
+    code = ((value - vertical_offset) / vertical_scale + vertical_position)
+           * codes_per_div
+in the smallest of ADC_TYPES holding them, if this reproduces all samples
+within the rounding of the CSV number format (6 significant digits).
+The grid codes_per_div is detected from the samples of each channel, see
+detect_codes_per_div(), e.g. 255 for the captures of the RTH1004 at hand.
+Other channels are stored as float64 values, which is lossless. Integer
+codes are delta-filtered, float64 values byte-shuffled before compression.
+
+File layout:
+    MAGIC, 8 bytes
+    Offset of the metadata, uint64 little-endian
+    Compressed chunks
+    Metadata as UTF-8 JSON: header attributes, encoding, codes_per_div
+    and chunk index of each channel
+
+The time axis is not stored, it is calculated as for
+RTH1004_DATA(implicit_time=True).
+
+Example:
+    write_archive(RTH1004_DATA("capture.csv"), "capture.rtha")
+    archive = CaptureArchive("capture.rtha")
+    time, samples = archive.read_window(-1e-6, 1e-6, channels=(4,))
+
+2026-10 Ulrich Lukas
+"""
+import json
+import struct
+import numpy as np
+from datetime import datetime
+
+from upylib import instrumentation
+from upylib.devices.rth1004 import RTH1004_DATA
+
+MAGIC = b"RTH1004A"
+# Increment when the file layout changes
+ARCHIVE_VERSION = 2
+# Integer types for ADC codes, smallest first
+ADC_TYPES = ("int8", "int16", "int32")
+CODECS = ("zlib", "lzma", "none")
+# Relative tolerance for storing samples as ADC codes
+CSV_PRECISION = 5e-6
+
+
+def _compress(data: bytes, codec: str, level: int) -> bytes:
+    if codec == "zlib":
+        import zlib
+        return zlib.compress(data, 6 if level is None else level)
+    if codec == "lzma":
+        import lzma
+        return lzma.compress(data, preset=0 if level is None else level)
+    return data
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zlib":
+        import zlib
+        return zlib.decompress(data)
+    if codec == "lzma":
+        import lzma
+        return lzma.decompress(data)
+    return data
+
+def detect_codes_per_div(divisions: np.ndarray,
+                         max_samples: int = 1 << 18) -> float:
+    """Resolution of the grid of the samples in codes per vertical division
+
+    divisions are the samples in units of vertical divisions from the
+    center, see ADC code above. The step of the grid is estimated from the
+    differences of neighbouring distinct values of up to max_samples
+    samples and then refined by a least squares fit of all of them to their
+    grid points, which averages out the rounding of the CSV number format.
+    As the smallest difference can span several grid steps for sparse
+    values, its fractions down to 1/max_divider are tried as well. The
+    result is the coarsest grid found which contains all values.
+    If the result is within rounding of an integer, that is returned.
+
+    Returns None for less than two distinct values or if no grid fits.
+    """
+    max_divider = 8
+    step = max(divisions.size // max_samples, 1)
+    values = np.unique(divisions[::step])
+    values = values[np.isfinite(values)]
+    deltas = np.diff(values)
+    deltas = deltas[deltas > 1e-9 * np.abs(values).max(initial=0)]
+    if deltas.size == 0:
+        return None
+    # Neighbouring values are a few (smallest) differences apart
+    multiples = np.rint(deltas / deltas.min())
+    small = multiples <= 64
+    coarse = (np.sum(multiples[small]**2)
+              / np.sum(multiples[small] * deltas[small]))
+    for divider in range(1, max_divider + 1):
+        codes = np.rint(values * coarse * divider)
+        if np.abs(codes).max() >= np.iinfo(np.int32).max:
+            return None
+        codes_per_div = np.sum(codes**2) / np.sum(codes * values)
+        residuals = np.abs(values * codes_per_div - codes)
+        if np.all(residuals <= 0.05 + CSV_PRECISION * np.abs(codes)):
+            break
+    else:
+        return None
+    rounded = round(codes_per_div)
+    if rounded and abs(rounded - codes_per_div) < 1e-6 * codes_per_div:
+        return float(rounded)
+    return float(codes_per_div)
+
+def _channel_encoding(samples: np.ndarray,
+                      scale: float,
+                      position: float,
+                      offset: float,
+                      encoding: str) -> tuple[str, float, np.ndarray]:
+    """Encoding, codes_per_div and codes (or float64 values) of the
+    samples of a channel
+
+    encoding "auto" selects the smallest ADC code type reproducing the
+    samples. An ADC code type forces quantization: on the detected grid
+    if the codes fit into that type, otherwise on the finest grid which
+    covers the range of the samples.
+    """
+    if encoding == "float64":
+        return "float64", None, np.ascontiguousarray(samples, np.float64)
+    divisions = (samples - offset) / scale + position
+    codes_per_div = detect_codes_per_div(divisions)
+    candidates = ADC_TYPES if encoding == "auto" else (encoding,)
+    for name in candidates:
+        limits = np.iinfo(name)
+        if codes_per_div is not None:
+            codes = np.rint(divisions * codes_per_div)
+            if (codes.size == 0 or codes.min() >= limits.min
+                    and codes.max() <= limits.max):
+                decoded = (codes / codes_per_div - position) * scale + offset
+                if np.all(np.abs(decoded - samples)
+                          <= CSV_PRECISION * np.abs(samples) + 1e-12 * scale):
+                    return name, codes_per_div, codes.astype(name)
+        if encoding != "auto":
+            extreme = np.abs(divisions).max(initial=0) or 1.0
+            lossy_codes_per_div = float(limits.max / extreme)
+            codes = np.rint(divisions * lossy_codes_per_div)
+            return (name, lossy_codes_per_div,
+                    np.clip(codes, limits.min, limits.max).astype(name))
+    return "float64", None, np.ascontiguousarray(samples, np.float64)
+
+def _encode_chunk(values: np.ndarray, codec: str, level: int) -> bytes:
+    if values.dtype == np.float64:
+        # Bytes of equal significance are grouped, which compresses better
+        data = values.view(np.uint8).reshape(-1, 8).T.tobytes()
+    else:
+        # Delta of integer codes wraps around in their own type
+        data = np.diff(values, prepend=values.dtype.type(0)).tobytes()
+    return _compress(data, codec, level)
+
+def _decode_chunk(data: bytes, codec: str, encoding: str) -> np.ndarray:
+    raw = _decompress(data, codec)
+    if encoding == "float64":
+        shuffled = np.frombuffer(raw, np.uint8).reshape(8, -1)
+        return shuffled.T.copy().view(np.float64).reshape(-1)
+    return np.cumsum(np.frombuffer(raw, encoding), dtype=encoding)
+
+
+@instrumentation.instrumented()
+def write_archive(capture: RTH1004_DATA,
+                  filename: str,
+                  chunk_size: int = 1 << 16,
+                  codec: str = "zlib",
+                  level: int = None,
+                  encoding: str = "auto",
+                  workers: int = None
+                  ) -> dict:
+    """Writes the header attributes and channels of capture to an archive
+
+    Parameters:
+        chunk_size: number of samples per chunk
+        codec: "zlib", "lzma" or "none"
+        level: compression level, default 6 for zlib and 0 for lzma
+        encoding: "auto" stores channels as ADC codes if possible, see
+                  above, one of ADC_TYPES forces quantization to ADC codes
+                  (lossy if the grid is too fine for that type), "float64"
+                  stores all samples unchanged
+        workers: number of compression threads, default see
+                 concurrent.futures.ThreadPoolExecutor
+
+    Returns a dict with the encoding and codes_per_div of each channel
+    and the size of the archive relative to the samples as float64.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec: {codec}, available: {CODECS}")
+    if encoding not in ("auto", "float64", *ADC_TYPES):
+        raise ValueError(f"Unknown encoding: {encoding}")
+    attributes = {name: getattr(capture, name)
+                  for name in RTH1004_DATA.header_attributes}
+    attributes["acquisition_time_stamp"] = (
+        capture.acquisition_time_stamp.isoformat())
+    channels = []
+    tasks = []
+    for ch in range(4):
+        scale = capture.vertical_scales[ch]
+        position = capture.vertical_positions[ch]
+        offset = capture.vertical_offsets[ch]
+        name, codes_per_div, values = _channel_encoding(
+            np.asarray(capture.chs[ch]), scale, position, offset, encoding)
+        channels.append({"encoding": name, "codes_per_div": codes_per_div,
+                         "scale": scale, "position": position,
+                         "offset": offset})
+        tasks += [values[start:start + chunk_size]
+                  for start in range(0, capture.record_length, chunk_size)]
+    with ThreadPoolExecutor(workers) as executor:
+        chunks = list(executor.map(_encode_chunk, tasks,
+                                   [codec] * len(tasks), [level] * len(tasks)))
+    n_chunks = len(tasks) // 4
+    with open(filename, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", 0))
+        file_position = f.tell()
+        index = []
+        for chunk in chunks:
+            index.append([file_position, len(chunk)])
+            f.write(chunk)
+            file_position += len(chunk)
+        for ch, channel in enumerate(channels):
+            channel["chunks"] = index[ch * n_chunks:(ch + 1) * n_chunks]
+        metadata = {
+            "version": ARCHIVE_VERSION,
+            "attributes": attributes,
+            "t_0": float(capture.t_0),
+            "chunk_size": chunk_size,
+            "codec": codec,
+            "channels": channels,
+        }
+        f.write(json.dumps(metadata).encode())
+        f.seek(len(MAGIC))
+        f.write(struct.pack("<Q", file_position))
+    instrumentation.count(bytes=4 * capture.record_length * 8,
+                          compressed_bytes=file_position)
+    return {"encodings": [channel["encoding"] for channel in channels],
+            "codes_per_div": [channel["codes_per_div"] for channel in channels],
+            "ratio": file_position / max(4 * capture.record_length * 8, 1)}
+
+
+class CaptureArchive():
+    """Reader for archives written by write_archive()
+
+    Attributes:
+        header: RTH1004_DATA with the header attributes but without sample
+                data, e.g. for header.time_to_index()
+        record_length, sample_interval, t_0: same as for RTH1004_DATA
+    """
+    def __init__(self, filename: str):
+        self.filename = filename
+        with open(filename, "rb") as f:
+            magic, metadata_offset = struct.unpack("<8sQ", f.read(16))
+            if magic != MAGIC:
+                raise ValueError(f"{filename} is not an RTH1004 archive")
+            f.seek(metadata_offset)
+            metadata = json.loads(f.read())
+        assert metadata["version"] == ARCHIVE_VERSION, (
+            f"Unsupported archive version: {metadata['version']}")
+        attributes = metadata["attributes"]
+        attributes["acquisition_time_stamp"] = datetime.fromisoformat(
+            attributes["acquisition_time_stamp"])
+        self.attributes = attributes
+        self.t_0 = metadata["t_0"]
+        self.chunk_size = metadata["chunk_size"]
+        self.codec = metadata["codec"]
+        self.channels = metadata["channels"]
+        self.record_length = attributes["record_length"]
+        self.sample_interval = attributes["sample_interval"]
+        self.header = self._new_capture()
+
+    def _new_capture(self) -> RTH1004_DATA:
+        capture = RTH1004_DATA()
+        capture.filename = self.filename
+        for name, value in self.attributes.items():
+            setattr(capture, name, value)
+        capture.t_0 = self.t_0
+        capture._set_layout({"columnar": True, "implicit_time": True})
+        return capture
+
+    @instrumentation.instrumented("CaptureArchive.read")
+    def read(self,
+             idx_start: int = 0,
+             idx_end: int = None,
+             channels: tuple = (1, 2, 3, 4),
+             workers: int = None
+             ) -> np.ndarray:
+        """Samples idx_start...idx_end-1 of channels (numbers 1...4), as
+        array of shape (len(channels), n_samples)
+
+        Only the chunks overlapping the range are read and decompressed,
+        in parallel threads.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        if idx_end is None:
+            idx_end = self.record_length
+        idx_start = max(idx_start, 0)
+        idx_end = min(idx_end, self.record_length)
+        n = max(idx_end - idx_start, 0)
+        result = np.empty((len(channels), n))
+        if n == 0:
+            return result
+        first = idx_start // self.chunk_size
+        last = (idx_end - 1) // self.chunk_size
+        tasks = []
+        with open(self.filename, "rb") as f:
+            for row, ch in enumerate(channels):
+                channel = self.channels[ch - 1]
+                for i in range(first, last + 1):
+                    offset, length = channel["chunks"][i]
+                    f.seek(offset)
+                    tasks.append((row, i, f.read(length)))
+
+        def decode(task):
+            row, i, data = task
+            channel = self.channels[channels[row] - 1]
+            values = _decode_chunk(data, self.codec, channel["encoding"])
+            chunk_start = i * self.chunk_size
+            start = max(idx_start - chunk_start, 0)
+            end = min(idx_end - chunk_start, len(values))
+            out = result[row, chunk_start + start - idx_start:
+                              chunk_start + end - idx_start]
+            values = values[start:end]
+            if channel["encoding"] == "float64":
+                out[...] = values
+            else:
+                np.divide(values, channel["codes_per_div"], out=out)
+                out -= channel["position"]
+                out *= channel["scale"]
+                out += channel["offset"]
+
+        with ThreadPoolExecutor(workers) as executor:
+            for _ in executor.map(decode, tasks):
+                pass
+        instrumentation.count(bytes=result.nbytes, chunks=len(tasks))
+        return result
+
+    def read_window(self,
+                    t_start: float,
+                    t_end: float,
+                    channels: tuple = (1, 2, 3, 4),
+                    workers: int = None
+                    ) -> tuple[np.ndarray, np.ndarray]:
+        """Time values and samples of channels from t_start to t_end,
+        located as for RTH1004_DATA.set_viewport()"""
+        idx_start = int(self.header.time_to_index(t_start, "left"))
+        idx_end = int(self.header.time_to_index(t_end, "right"))
+        return (self.header.time_range(idx_start, idx_end),
+                self.read(idx_start, idx_end, channels, workers))
+
+    def capture(self, workers: int = None) -> RTH1004_DATA:
+        """Complete capture as RTH1004_DATA, with an implicit time axis and
+        samples in columnar layout"""
+        capture = self._new_capture()
+        capture.samples_raw = self.read(workers=workers).T
+        capture.set_viewport()
+        return capture
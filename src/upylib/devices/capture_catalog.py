@@ -0,0 +1,308 @@
+"""Searchable index of RTH1004 CSV savefiles in a local SQLite database
+
+scan() reads only the header block of each CSV file, see
+RTH1004_DATA.read_header(). Files whose modification time and size did not
+change since the last scan are skipped, also files which could not be
+parsed. Optionally, the minimum, maximum and RMS value of each channel are
+calculated once and stored as well.
+
+Queries then only touch the database, e.g. all CH4 current captures at
+5 A/div from the last week with firmware 1.80:
+
+    catalog = CaptureCatalog("captures.sqlite")
+    catalog.scan("/data/scope")
+    rows = catalog.find(vertical_unit_ch4="A", vertical_scale_ch4=5,
+                        firmware_version="1.80*",
+                        since=datetime.now() - timedelta(days=7))
+    captures = [RTH1004_DATA(row["filename"]) for row in rows]
+
+2026-10 Ulrich Lukas
+"""
+import logging
+import os
+import sqlite3
+import numpy as np
+from datetime import datetime
+
+from upylib import instrumentation
+from upylib.devices.rth1004 import RTH1004_DATA
+
+logger = logging.getLogger(__name__)
+
+# Increment when the table layout changes, the catalog is then rebuilt
+CATALOG_VERSION = 2
+
+_CHANNEL_COLUMNS = (
+    ("probe_setting", "TEXT", "probe_settings"),
+    ("vertical_unit", "TEXT", "vertical_units"),
+    ("vertical_scale", "REAL", "vertical_scales"),
+    ("vertical_position", "REAL", "vertical_positions"),
+    ("vertical_offset", "REAL", "vertical_offsets"),
+    ("history_index", "INTEGER", "history_index"),
+    ("history_time_stamp", "REAL", "history_time_stamps"),
+)
+_SUMMARIES = ("min", "max", "rms")
+# Raised by RTH1004_DATA for files which are not valid savefiles
+_PARSE_ERRORS = (AssertionError, ValueError, KeyError, IndexError,
+                 StopIteration, OSError, UnicodeDecodeError)
+
+# Table columns and their SQL types
+COLUMNS = {
+    "filename": "TEXT PRIMARY KEY",
+    "mtime_ns": "INTEGER",
+    "size": "INTEGER",
+    "serial_number": "INTEGER",
+    "firmware_version": "TEXT",
+    "acquisition_time_stamp": "TEXT",
+    "waveform_type": "TEXT",
+    "acquisition_mode": "TEXT",
+    "horizontal_unit": "TEXT",
+    "horizontal_scale": "REAL",
+    "horizontal_position": "REAL",
+    "reference_point_percent": "INTEGER",
+    "sample_interval": "REAL",
+    "record_length": "INTEGER",
+    "t_0": "REAL",
+    **{f"{name}_ch{ch}": sql_type
+       for name, sql_type, _ in _CHANNEL_COLUMNS for ch in range(1, 5)},
+    **{f"{name}_ch{ch}": "REAL" for name in _SUMMARIES for ch in range(1, 5)},
+}
+_INDEXED = ("acquisition_time_stamp", "serial_number", "record_length")
+
+
+class CaptureCatalog():
+    """Index of RTH1004 captures stored in the SQLite database file
+    database, which is created if it does not exist
+
+    Acquisition time stamps are stored as ISO 8601 text, which sorts in
+    time order. Per-channel settings are stored in columns with suffix
+    _ch1..._ch4, e.g. vertical_scale_ch4. The channel summaries min_ch1,
+    max_ch1, rms_ch1 etc. are NULL for files scanned without summaries.
+    Files which could not be parsed are kept in the table failed, with
+    their modification time and size.
+    """
+    def __init__(self, database: str = "captures.sqlite"):
+        self.database = database
+        self.connection = sqlite3.connect(database)
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != CATALOG_VERSION:
+            with self.connection:
+                self.connection.execute("DROP TABLE IF EXISTS captures")
+                self.connection.execute("DROP TABLE IF EXISTS failed")
+                self.connection.execute(
+                    "CREATE TABLE failed (filename TEXT PRIMARY KEY, "
+                    "mtime_ns INTEGER, size INTEGER)")
+                columns = ", ".join(f"{name} {sql_type}"
+                                    for name, sql_type in COLUMNS.items())
+                self.connection.execute(f"CREATE TABLE captures ({columns})")
+                for name in _INDEXED:
+                    self.connection.execute(
+                        f"CREATE INDEX idx_{name} ON captures ({name})")
+                self.connection.execute(
+                    f"PRAGMA user_version = {CATALOG_VERSION}")
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM captures").fetchone()[0]
+
+    def failed_files(self) -> list:
+        """File names of the files which could not be parsed"""
+        return [row[0] for row in self.connection.execute(
+            "SELECT filename FROM failed ORDER BY filename")]
+
+    @instrumentation.instrumented("CaptureCatalog.scan")
+    def scan(self,
+             directory: str,
+             suffix: str = ".csv",
+             summaries: bool = False,
+             workers: int = 0
+             ) -> dict:
+        """Adds new and changed CSV savefiles below directory and removes
+        entries of files which no longer exist there
+
+        Only files with names ending in suffix are considered. Files which
+        are not RTH1004 savefiles, or whose samples can not be parsed for
+        the summaries, are logged and skipped. They are recorded as failed
+        and skipped without parsing by later scans until they change. With
+        summaries=True, all samples are read once to store the minimum,
+        maximum and RMS value of each channel, also for files scanned
+        before without summaries. workers > 0 parses the files in that
+        many worker processes, which mostly pays off with summaries.
+
+        Returns a dict with the numbers of files added, updated, removed,
+        unchanged and skipped.
+        """
+        directory = os.path.abspath(directory)
+        # File name: modification time, size and presence of summaries
+        known = {
+            row[0]: row[1:] for row in self.connection.execute(
+                "SELECT filename, mtime_ns, size, rms_ch1 IS NOT NULL "
+                "FROM captures WHERE substr(filename, 1, ?) = ?",
+                (len(directory) + 1, directory + os.sep))
+        }
+        known_failed = {
+            row[0]: row[1:] for row in self.connection.execute(
+                "SELECT filename, mtime_ns, size FROM failed "
+                "WHERE substr(filename, 1, ?) = ?",
+                (len(directory) + 1, directory + os.sep))
+        }
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0,
+                  "skipped": 0}
+        found = set()
+        todo = []
+        for root, _, filenames in os.walk(directory):
+            for name in filenames:
+                if not name.endswith(suffix):
+                    continue
+                filename = os.path.join(root, name)
+                stat = os.stat(filename)
+                found.add(filename)
+                mtime_ns, size, has_summaries = known.get(filename,
+                                                          (None,) * 3)
+                if (mtime_ns == stat.st_mtime_ns and size == stat.st_size
+                        and (has_summaries or not summaries)):
+                    counts["unchanged"] += 1
+                elif known_failed.get(filename) == (stat.st_mtime_ns,
+                                                    stat.st_size):
+                    counts["skipped"] += 1
+                else:
+                    todo.append((filename, stat.st_mtime_ns, stat.st_size))
+
+        if workers > 0:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(workers) as executor:
+                rows = list(executor.map(
+                    _scan_file, todo, [summaries] * len(todo),
+                    chunksize=max(len(todo) // (4 * workers), 1)))
+        else:
+            rows = [_scan_file(args, summaries) for args in todo]
+
+        placeholders = ", ".join("?" * len(COLUMNS))
+        removed = [(filename,) for filename in known.keys() - found]
+        failed = []
+        with self.connection:
+            for (filename, mtime_ns, size), row in zip(todo, rows):
+                if row is None:
+                    counts["skipped"] += 1
+                    failed.append((filename, mtime_ns, size))
+                    if filename in known:
+                        removed.append((filename,))
+                    continue
+                counts["updated" if filename in known else "added"] += 1
+                self.connection.execute(
+                    f"INSERT OR REPLACE INTO captures VALUES ({placeholders})",
+                    [row.get(name) for name in COLUMNS])
+            self.connection.executemany(
+                "DELETE FROM captures WHERE filename = ?", removed)
+            # Failed entries of files which were parsed now or are gone
+            self.connection.executemany(
+                "DELETE FROM failed WHERE filename = ?",
+                [(filename,) for filename in known_failed.keys() - found]
+                + [(filename,) for filename, _, _ in todo])
+            self.connection.executemany(
+                "INSERT INTO failed VALUES (?, ?, ?)", failed)
+        counts["removed"] = len(removed)
+        instrumentation.count(files=len(found), parsed=len(todo))
+        logger.info("Scanned %s: %s", directory, counts)
+        return counts
+
+    def query(self,
+              where: str = None,
+              params: tuple = (),
+              order_by: str = "acquisition_time_stamp"
+              ) -> list:
+        """Rows matching the SQL condition where, with ? placeholders for
+        params, as list of dicts of all columns"""
+        sql = "SELECT * FROM captures"
+        if where:
+            sql += f" WHERE {where}"
+        if order_by:
+            sql += f" ORDER BY {order_by}"
+        cursor = self.connection.execute(sql, params)
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    def find(self,
+             since: datetime = None,
+             until: datetime = None,
+             **conditions
+             ) -> list:
+        """Rows of captures acquired between since and until, matching all
+        conditions given as column=value. Values can be:
+            a number or string: equal values
+            a string containing * or ?: shell-style pattern (SQLite GLOB)
+            a tuple (low, high): values in the closed range low...high
+
+        Returns a list of dicts of all columns, in order of acquisition.
+        """
+        clauses, params = [], []
+        for name, value in conditions.items():
+            if name not in COLUMNS:
+                raise ValueError(f"Unknown column: {name}")
+            if isinstance(value, tuple):
+                clauses.append(f"{name} BETWEEN ? AND ?")
+                params += value
+            elif isinstance(value, str) and ("*" in value or "?" in value):
+                clauses.append(f"{name} GLOB ?")
+                params.append(value)
+            else:
+                clauses.append(f"{name} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("acquisition_time_stamp >= ?")
+            params.append(since.isoformat(sep=" "))
+        if until is not None:
+            clauses.append("acquisition_time_stamp <= ?")
+            params.append(until.isoformat(sep=" "))
+        return self.query(" AND ".join(clauses), tuple(params))
+
+
+def _scan_file(args: tuple, summaries: bool) -> dict:
+    """Catalog row of one CSV savefile, None if it can not be parsed"""
+    filename, mtime_ns, size = args
+    capture = RTH1004_DATA()
+    try:
+        capture.read_header(filename)
+    except _PARSE_ERRORS as e:
+        logger.warning("Skipping %s, not an RTH1004 savefile: %r", filename, e)
+        return None
+    row = {"filename": filename, "mtime_ns": mtime_ns, "size": size,
+           "t_0": capture.t_0}
+    for name in RTH1004_DATA.header_attributes:
+        value = getattr(capture, name)
+        if not isinstance(value, list):
+            row[name] = value
+    row["acquisition_time_stamp"] = capture.acquisition_time_stamp.isoformat(
+        sep=" ")
+    for name, _, attribute in _CHANNEL_COLUMNS:
+        for ch, value in enumerate(getattr(capture, attribute), 1):
+            row[f"{name}_ch{ch}"] = value
+    if summaries:
+        minimum = np.full(4, np.inf)
+        maximum = np.full(4, -np.inf)
+        sum_squares = np.zeros(4)
+        try:
+            for chunk in capture.iter_chunks(1 << 20):
+                chs = chunk.chs
+                np.minimum(minimum, chs.min(axis=1), out=minimum)
+                np.maximum(maximum, chs.max(axis=1), out=maximum)
+                sum_squares += np.einsum("ij,ij->i", chs, chs)
+        except _PARSE_ERRORS as e:
+            logger.warning("Skipping %s, sample data can not be parsed: %r",
+                           filename, e)
+            return None
+        rms = np.sqrt(sum_squares / capture.record_length)
+        for ch in range(4):
+            row[f"min_ch{ch + 1}"] = float(minimum[ch])
+            row[f"max_ch{ch + 1}"] = float(maximum[ch])
+            row[f"rms_ch{ch + 1}"] = float(rms[ch])
+    return row
@@ -0,0 +1,120 @@
+"""Vectorized waveform measurements on sampled oscilloscope data
+
+All functions work on complete sample arrays in a fixed number of NumPy
+passes, without Python loops over edges or windows.
+
+2026-10 Ulrich Lukas
+"""
+import numpy as np
+
+def find_edges(samples: np.ndarray,
+               low: float,
+               high: float,
+               levels: tuple = None
+               ) -> dict:
+    """Detect rising and falling edges of a waveform using hysteresis.
+
+    A rising edge is detected when the signal crosses from <= low to
+    >= high, a falling edge for the opposite case. Noise inside the
+    band between low and high does not produce additional edges.
+
+    levels is a tuple (base, top) of the two signal state levels used
+    as reference for overshoot. These default to the median values of
+    all samples below low and above high.
+
+    Returns a dict of per-edge arrays, in time order:
+        rising:          True for rising, False for falling edges
+        idx_start:       Last sample before the edge in the old state
+        idx_end:         First sample after the edge in the new state
+        crossing_start:  Linearly interpolated fractional sample index
+                         of the crossing of the start threshold
+        crossing_end:    Same for the crossing of the end threshold
+        duration:        crossing_end - crossing_start in samples,
+                         i.e. rise or fall time between low and high
+        overshoot:       Overshoot (rising) or undershoot (falling)
+                         after the edge up to the next edge, in percent
+                         of the amplitude top - base
+    """
+    above = samples >= high
+    idx_defined = np.flatnonzero(above | (samples <= low))
+    state = above[idx_defined]
+    changes = np.flatnonzero(state[1:] != state[:-1]) + 1
+    idx_start = idx_defined[changes - 1]
+    idx_end = idx_defined[changes]
+    rising = state[changes]
+
+    threshold_start = np.where(rising, low, high)
+    threshold_end = np.where(rising, high, low)
+    x_start = samples[idx_start]
+    x_end = samples[idx_end]
+    crossing_start = idx_start + (threshold_start - x_start) / (
+        samples[idx_start + 1] - x_start)
+    crossing_end = idx_end - 1 + (threshold_end - samples[idx_end - 1]) / (
+        x_end - samples[idx_end - 1])
+
+    if levels is None:
+        levels = (np.median(samples[samples <= low]),
+                  np.median(samples[above]))
+    base, top = levels
+    if len(idx_end):
+        seg_max = np.maximum.reduceat(samples, idx_end)
+        seg_min = np.minimum.reduceat(samples, idx_end)
+    else:
+        seg_max = seg_min = np.empty(0)
+    overshoot = 100 * np.where(rising, seg_max - top, base - seg_min) / (
+        top - base)
+
+    return {
+        "rising": rising,
+        "idx_start": idx_start,
+        "idx_end": idx_end,
+        "crossing_start": crossing_start,
+        "crossing_end": crossing_end,
+        "duration": crossing_end - crossing_start,
+        "overshoot": overshoot,
+    }
+
+def window_stats(samples,
+                 idx_starts: np.ndarray,
+                 idx_ends: np.ndarray
+                 ) -> dict:
+    """Statistics of many windows samples[..., idx_start:idx_end]
+
+    samples is a single waveform or a 2-D array or sequence of
+    waveforms (channels) of equal length. Windows may overlap. Indices
+    range from 0 to the waveform length, as for the viewport indices of
+    RTH1004_DATA.
+
+    Returns a dict of arrays of shape (n_channels, n_windows), or
+    (n_windows,) for a single waveform, with the keys:
+        sum, mean, rms, min, max, p2p
+    Empty windows yield NaN.
+    """
+    single = np.ndim(samples) == 1
+    channels = [samples] if single else samples
+    idx_starts = np.asarray(idx_starts, dtype=np.intp)
+    idx_ends = np.asarray(idx_ends, dtype=np.intp)
+    n = idx_ends - idx_starts
+    # Every other entry of reduceat() results then covers one window
+    indices = np.column_stack((idx_starts, idx_ends)).ravel()
+    results = {key: [] for key in ("sum", "rms", "min", "max")}
+    for channel in channels:
+        # reduceat() needs indices below the length, the appended element
+        # is only reduced into the discarded entries
+        if indices.size and indices.max() >= len(channel):
+            channel = np.append(channel, 0.0)
+        results["sum"].append(np.add.reduceat(channel, indices)[::2])
+        results["rms"].append(
+            np.add.reduceat(np.square(channel), indices)[::2])
+        results["min"].append(np.minimum.reduceat(channel, indices)[::2])
+        results["max"].append(np.maximum.reduceat(channel, indices)[::2])
+    stats = {key: np.array(values) for key, values in results.items()}
+    empty = n <= 0
+    for values in stats.values():
+        values[:, empty] = np.nan
+    stats["mean"] = stats["sum"] / n
+    stats["rms"] = np.sqrt(stats["rms"] / n)
+    stats["p2p"] = stats["max"] - stats["min"]
+    if single:
+        stats = {key: values[0] for key, values in stats.items()}
+    return stats
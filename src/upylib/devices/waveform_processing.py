@@ -0,0 +1,169 @@
+"""Waveform processing for long sample records
+
+process_channels() computes the same results as the filter_average(),
+do_time_derivative() and do_time_integral() methods of RTH1004_DATA, for
+all channels of a 2-D array at once and into a single preallocated output
+buffer. If numba is installed, this is done in one compiled pass over the
+samples, otherwise with a fixed sequence of in-place NumPy operations.
+numba and SciPy are only imported on first use.
+
+minmax_pyramid() and minmax_decimate() provide a peak-preserving
+decimation of long records for plotting.
+
+2026-10 Ulrich Lukas
+"""
+from importlib.util import find_spec
+
+import numpy as np
+
+numba_available = find_spec("numba") is not None
+
+def process_channels(samples: np.ndarray,
+                     sample_interval: float,
+                     filter_avg: int = 1,
+                     out: np.ndarray = None,
+                     use_numba: bool = None
+                     ) -> np.ndarray:
+    """Moving average, time derivative and time integral of waveforms
+
+    samples is a 2-D array of shape (n_channels, n_samples).
+
+    Returns an array of shape (3, n_channels, n_samples) holding:
+        [0]: Moving average of [filter_avg] samples ("nearest" mode)
+        [1]: Time derivative of the moving average
+        [2]: Time integral of the unfiltered samples
+    If out is given, the results are written into it and no other
+    full-size arrays are allocated.
+
+    use_numba defaults to True if numba is installed. The compiled kernel
+    uses a running sum for the moving average, which can differ from the
+    SciPy result in the last digits.
+    """
+    samples = np.atleast_2d(samples)
+    if out is None:
+        out = np.empty((3,) + samples.shape)
+    if use_numba is None:
+        use_numba = numba_available
+    if use_numba:
+        if not numba_available:
+            raise ImportError("use_numba=True requires the numba package")
+        _compiled_kernel()(samples, filter_avg, sample_interval,
+                          out[0], out[1], out[2])
+        return out
+    filtered, derivative, integral = out
+    if filter_avg > 1:
+        from scipy.ndimage import uniform_filter1d
+        uniform_filter1d(samples, filter_avg, axis=1, mode="nearest",
+                         output=filtered)
+    else:
+        np.copyto(filtered, samples)
+    np.subtract(filtered[:, 1:], filtered[:, :-1], out=derivative[:, 1:])
+    derivative[:, :1] = derivative[:, 1:2]
+    np.divide(derivative, sample_interval, out=derivative)
+    np.multiply(samples, sample_interval, out=integral)
+    np.cumsum(integral, axis=1, out=integral)
+    return out
+
+def _fused_kernel(samples, size, dt, filtered, derivative, integral):
+    """Single pass over each channel, see process_channels()"""
+    n_channels, n = samples.shape
+    # Same window alignment as scipy.ndimage.uniform_filter1d, origin=0
+    left = size // 2
+    right = size - 1 - left
+    for ch in range(n_channels):
+        x = samples[ch]
+        window_sum = 0.0
+        for j in range(-left, right + 1):
+            window_sum += x[min(max(j, 0), n - 1)]
+        accumulated = 0.0
+        for i in range(n):
+            filtered[ch, i] = window_sum / size
+            window_sum += (x[min(i + right + 1, n - 1)]
+                           - x[max(i - left, 0)])
+            if i > 0:
+                derivative[ch, i] = (filtered[ch, i]
+                                     - filtered[ch, i - 1]) / dt
+            accumulated += x[i] * dt
+            integral[ch, i] = accumulated
+        if n > 1:
+            derivative[ch, 0] = derivative[ch, 1]
+
+_fused_kernel_jit = None
+
+def _compiled_kernel():
+    """_fused_kernel() compiled by numba on first use"""
+    global _fused_kernel_jit
+    if _fused_kernel_jit is None:
+        import numba
+        _fused_kernel_jit = numba.njit(cache=True, nogil=True)(_fused_kernel)
+    return _fused_kernel_jit
+
+def minmax_pyramid(samples: np.ndarray,
+                   factor: int = 8,
+                   min_blocks: int = 1024
+                   ) -> list:
+    """Multi-resolution min/max envelope of a waveform
+
+    Level k of the returned list is an array of shape (2, n_blocks)
+    holding the minimum and maximum of consecutive blocks of
+    factor**(k + 1) samples. The last block of a level can be incomplete.
+    Levels are added until a level has less than min_blocks blocks.
+    """
+    pyramid = []
+    mins = maxs = samples
+    while len(mins) > min_blocks:
+        block_starts = np.arange(0, len(mins), factor)
+        mins = np.minimum.reduceat(mins, block_starts)
+        maxs = np.maximum.reduceat(maxs, block_starts)
+        pyramid.append(np.array((mins, maxs)))
+    return pyramid
+
+def minmax_decimate(samples: np.ndarray,
+                    pyramid: list,
+                    idx_start: int,
+                    idx_end: int,
+                    n_buckets: int,
+                    factor: int = 8
+                    ) -> tuple[np.ndarray, np.ndarray]:
+    """Peak-preserving min/max decimation of samples[idx_start:idx_end]
+
+    The index range is divided into n_buckets buckets. For each bucket,
+    the minimum and maximum value are returned as two points, so that
+    narrow spikes remain visible. The coarsest level of the minmax_pyramid()
+    with blocks still smaller than a bucket is used as input, so that the
+    cost depends on n_buckets and not on the length of the index range.
+    Bucket boundaries are aligned to the blocks of that level.
+
+    Returns sample indices and values of the resulting points. Ranges of
+    no more than 2 * n_buckets samples are returned without decimation.
+    """
+    n_samples = idx_end - idx_start
+    if n_samples <= 2 * n_buckets:
+        return np.arange(idx_start, idx_end), samples[idx_start:idx_end]
+    samples_per_bucket = n_samples / n_buckets
+    level = 0
+    block_size = 1
+    while (level < len(pyramid)
+           and block_size * factor <= samples_per_bucket):
+        level += 1
+        block_size *= factor
+    if level == 0:
+        mins = maxs = samples
+    else:
+        mins, maxs = pyramid[level - 1]
+    block_start = idx_start // block_size
+    block_end = -(-idx_end // block_size)
+    bucket_starts = (np.arange(n_buckets) * (block_end - block_start)
+                     ) // n_buckets
+    values = np.empty((n_buckets, 2))
+    values[:, 0] = np.minimum.reduceat(mins[block_start:block_end],
+                                       bucket_starts)
+    values[:, 1] = np.maximum.reduceat(maxs[block_start:block_end],
+                                       bucket_starts)
+    # Alternate min-max and max-min order. A line through these points
+    # then consists of vertical strokes joined by short connections,
+    # which renders much faster than a full-height zigzag.
+    values[1::2] = values[1::2, ::-1]
+    values = values.ravel()
+    idx = np.repeat((block_start + bucket_starts) * block_size, 2)
+    return np.maximum(idx, idx_start), values
@@ -0,0 +1,193 @@
+"""Spectral analysis of sampled oscilloscope data
+
+All functions take arrays of shape (..., n_samples) and transform all
+traces, e.g. of shape (n_windows, n_channels, n_samples), in one batched
+real FFT along the last axis.
+
+Traces are zero-padded to the next fast FFT length, a product of powers
+of 2, 3 and 5. Window functions, their scaling factors and the fast
+lengths are calculated once per trace length and cached.
+
+Amplitudes are peak values of sinusoidal components, PSDs are one-sided,
+in units² per Hz.
+
+2026-10 Ulrich Lukas
+"""
+import numpy as np
+
+# Generalized cosine windows: coefficients and half width of the main lobe
+# in frequency bins. The flat top window gives the most accurate amplitudes
+# of components between frequency bins.
+WINDOWS = {
+    "rect": ((1.0,), 1),
+    "hann": ((0.5, 0.5), 2),
+    "hamming": ((0.54, 0.46), 2),
+    "blackman": ((0.42, 0.5, 0.08), 3),
+    "flattop": ((0.21557895, 0.41663158, 0.277263158, 0.083578947,
+                 0.006947368), 5),
+}
+
+_fast_lengths = {}
+_window_setups = {}
+
+
+def fast_length(n: int) -> int:
+    """Smallest FFT length >= n which is a product of powers of 2, 3 and 5"""
+    if n not in _fast_lengths:
+        best = 1 << max(n - 1, 0).bit_length()
+        power_5 = 1
+        while power_5 < best:
+            power_35 = power_5
+            while power_35 < best:
+                # Smallest power of two making the product >= n
+                length = power_35 << max(-(-n // power_35) - 1, 0).bit_length()
+                best = min(best, length)
+                power_35 *= 3
+            power_5 *= 5
+        _fast_lengths[n] = best
+    return _fast_lengths[n]
+
+def window(name: str, n: int) -> np.ndarray:
+    """Periodic window function of length n, cached and read-only"""
+    return _window_setup(n, name, False)[1]
+
+def _window_setup(n, window_name, pad):
+    """FFT length, window and one-sided amplitude scaling for traces of
+    length n, cached"""
+    key = (n, window_name, pad)
+    if key not in _window_setups:
+        if window_name not in WINDOWS:
+            raise ValueError(f"Unknown window: {window_name}, "
+                             f"available: {', '.join(WINDOWS)}")
+        coefficients, _ = WINDOWS[window_name]
+        phase = 2 * np.pi / n * np.arange(n)
+        window = np.zeros(n)
+        for k, a_k in enumerate(coefficients):
+            window += (-1)**k * a_k * np.cos(k * phase)
+        window.flags.writeable = False
+        n_fft = fast_length(n) if pad else n
+        # Peak amplitudes: DC and the Nyquist frequency are not doubled
+        scale = np.full(n_fft // 2 + 1, 2 / window.sum())
+        scale[0] /= 2
+        if n_fft % 2 == 0:
+            scale[-1] /= 2
+        _window_setups[key] = (n_fft, window, scale)
+    return _window_setups[key]
+
+def amplitude_spectrum(samples: np.ndarray,
+                       sample_interval: float,
+                       window: str = "hann",
+                       pad: bool = True
+                       ) -> tuple[np.ndarray, np.ndarray]:
+    """One-sided amplitude spectrum of the traces in samples
+
+    The window is one of WINDOWS. With pad=True, traces are zero-padded
+    to the next fast FFT length, which also interpolates the spectrum.
+
+    Returns the frequencies in Hz and the peak amplitudes of shape
+    (..., n_frequencies).
+    """
+    samples = np.asarray(samples, dtype=float)
+    n_fft, window, scale = _window_setup(samples.shape[-1], window, pad)
+    spectrum = np.abs(np.fft.rfft(samples * window, n_fft))
+    spectrum *= scale
+    return np.fft.rfftfreq(n_fft, sample_interval), spectrum
+
+def power_spectral_density(samples: np.ndarray,
+                           sample_interval: float,
+                           segment_length: int = None,
+                           overlap: float = 0.5,
+                           window: str = "hann"
+                           ) -> tuple[np.ndarray, np.ndarray]:
+    """One-sided power spectral density of the traces using Welch's method
+
+    Each trace is cut into segments of segment_length samples, default
+    is an eighth of the trace length, overlapping by the given fraction.
+    The mean of each segment is removed before windowing. The segments of
+    all traces are transformed in one batched FFT, their power spectra
+    are averaged.
+
+    Returns the frequencies in Hz and the PSD in units² per Hz of shape
+    (..., n_frequencies).
+    """
+    samples = np.asarray(samples, dtype=float)
+    n = samples.shape[-1]
+    if segment_length is None:
+        segment_length = max(n // 8, 1)
+    if not 0 < segment_length <= n:
+        raise ValueError(f"Segment length must be 1...{n}")
+    step = max(int(round(segment_length * (1 - overlap))), 1)
+    n_fft, window, _ = _window_setup(segment_length, window, True)
+    segments = np.lib.stride_tricks.sliding_window_view(
+        samples, segment_length, axis=-1)[..., ::step, :]
+    segments = segments - segments.mean(axis=-1, keepdims=True)
+    segments *= window
+    spectra = np.fft.rfft(segments, n_fft)
+    power = spectra.real**2
+    power += spectra.imag**2
+    psd = power.mean(axis=-2)
+    # One-sided density: DC and the Nyquist frequency are not doubled
+    psd *= 2 * sample_interval / np.dot(window, window)
+    psd[..., 0] /= 2
+    if n_fft % 2 == 0:
+        psd[..., -1] /= 2
+    return np.fft.rfftfreq(n_fft, sample_interval), psd
+
+def harmonics(samples: np.ndarray,
+              sample_interval: float,
+              f_fundamental=None,
+              n_harmonics: int = 10,
+              window: str = "flattop",
+              pad: bool = True
+              ) -> dict:
+    """Amplitudes of the fundamental and its harmonics, and the total
+    harmonic distortion (THD) of the traces
+
+    f_fundamental is the fundamental frequency in Hz, scalar or per trace.
+    By default, it is located at the largest component of the amplitude
+    spectrum outside of the main lobe of DC, refined by parabolic
+    interpolation. The amplitude of each harmonic is the spectrum peak
+    within the main lobe width of the window around its expected frequency.
+
+    Returns a dict of:
+        f_fundamental: Fundamental frequency in Hz, shape (...)
+        amplitudes:    Peak amplitudes of shape (..., n_harmonics), the
+                       fundamental first. Harmonics above the Nyquist
+                       frequency are NaN.
+        thd:           sqrt(sum of squared harmonic amplitudes) divided by
+                       the amplitude of the fundamental, shape (...)
+    """
+    freqs, spectrum = amplitude_spectrum(samples, sample_interval,
+                                         window, pad)
+    n_bins = spectrum.shape[-1]
+    df = freqs[1]
+    # Main lobe half width in bins of the padded spectrum
+    n = np.shape(samples)[-1]
+    n_fft = _window_setup(n, window, pad)[0]
+    width = int(np.ceil(WINDOWS[window][1] * n_fft / n))
+    if f_fundamental is None:
+        # Skipping the main lobe of DC
+        peak = np.argmax(spectrum[..., width:], axis=-1)[..., None] + width
+        inner = np.clip(peak, 1, n_bins - 2)
+        left, center, right = (np.take_along_axis(spectrum, inner + offset, -1)
+                               for offset in (-1, 0, 1))
+        with np.errstate(all="ignore"):
+            fraction = 0.5 * (left - right) / (left - 2*center + right)
+        fraction = np.where(np.isfinite(fraction) & (peak == inner),
+                            np.clip(fraction, -0.5, 0.5), 0.0)
+        f_fundamental = ((peak + fraction) * df)[..., 0]
+    f_fundamental = np.broadcast_to(f_fundamental, spectrum.shape[:-1])
+    # Bins of shape (..., n_harmonics, 2 * width + 1) around each harmonic
+    orders = np.arange(1, n_harmonics + 1)
+    centers = np.rint(f_fundamental[..., None] * orders / df).astype(np.intp)
+    bins = centers[..., None] + np.arange(-width, width + 1)
+    lobes = np.take_along_axis(
+        spectrum[..., None, :],
+        np.clip(bins, 0, n_bins - 1), -1)
+    amplitudes = lobes.max(axis=-1)
+    amplitudes[centers >= n_bins - 1] = np.nan
+    with np.errstate(all="ignore"):
+        thd = np.sqrt(np.nansum(amplitudes[..., 1:]**2, axis=-1)) / (
+            amplitudes[..., 0])
+    return {"f_fundamental": f_fundamental, "amplitudes": amplitudes,
+            "thd": thd}
@@ -0,0 +1,204 @@
+"""Opt-in timing and profiling instrumentation for analysis pipelines
+
+Functions decorated with @instrumented() are recorded as stages with wall
+time and counters, e.g. bytes processed or iteration counts, added by the
+function with count(). Stages can be nested. When recording is disabled,
+which is the default, the decorator only adds one flag check per call.
+
+With memory=True, every stage also records:
+    peak_alloc_bytes: Peak of memory traced by tracemalloc during the stage,
+                      above the traced memory at stage start. This includes
+                      numpy arrays.
+    alloc_blocks:     Change of the number of allocated Python memory
+                      blocks (sys.getallocatedblocks())
+
+Usage:
+    from upylib import instrumentation
+    with instrumentation.recording():
+        scope = RTH1004_DATA(filename)
+        scope.process_chs(filter_avg=16)
+    print(instrumentation.summary())
+    instrumentation.chrome_trace("trace.json")
+
+The trace file can be opened in chrome://tracing or https://ui.perfetto.dev
+
+Stages run in worker processes, e.g. by load_many(), are not recorded.
+
+2026-10 Ulrich Lukas
+"""
+import functools
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+enabled = False
+trace_memory = False
+# True if tracemalloc was started by enable() and is stopped by disable()
+_started_tracemalloc = False
+_records = []
+_local = threading.local()
+
+
+class _Stage():
+    __slots__ = ("name", "start_ns", "counters", "depth",
+                 "start_traced", "start_blocks", "peak")
+
+    def __init__(self, name, depth):
+        self.name = name
+        self.depth = depth
+        self.counters = {}
+        self.start_ns = time.perf_counter_ns()
+
+
+def _stack():
+    try:
+        return _local.stack
+    except AttributeError:
+        _local.stack = []
+        return _local.stack
+
+def enable(memory: bool = False):
+    """Starts recording. memory=True also traces allocations, which makes
+    the instrumented functions considerably slower"""
+    import tracemalloc
+    global enabled, trace_memory, _started_tracemalloc
+    trace_memory = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracemalloc = True
+    enabled = True
+
+def disable():
+    """Stops recording, the records are kept. Memory tracing is only
+    stopped if it was started by enable()."""
+    global enabled, trace_memory, _started_tracemalloc
+    enabled = False
+    trace_memory = False
+    if _started_tracemalloc:
+        import tracemalloc
+        tracemalloc.stop()
+        _started_tracemalloc = False
+
+def clear():
+    """Discards all records"""
+    _records.clear()
+
+@contextmanager
+def recording(memory: bool = False):
+    """Context manager for enable() and disable()"""
+    enable(memory)
+    try:
+        yield
+    finally:
+        disable()
+
+@contextmanager
+def stage(name: str):
+    """Records the enclosed code as a stage, if recording is enabled"""
+    if not enabled:
+        yield
+        return
+    stack = _stack()
+    current = _Stage(name, len(stack))
+    if trace_memory:
+        import tracemalloc
+        traced, peak = tracemalloc.get_traced_memory()
+        # The enclosing stage keeps the peak reached so far
+        if stack:
+            stack[-1].peak = max(stack[-1].peak, peak)
+        tracemalloc.reset_peak()
+        current.start_traced = traced
+        current.peak = traced
+        current.start_blocks = sys.getallocatedblocks()
+    stack.append(current)
+    try:
+        yield
+    finally:
+        stack.pop()
+        end_ns = time.perf_counter_ns()
+        if trace_memory and hasattr(current, "peak"):
+            peak = max(current.peak, tracemalloc.get_traced_memory()[1])
+            if stack and hasattr(stack[-1], "peak"):
+                stack[-1].peak = max(stack[-1].peak, peak)
+            current.counters["peak_alloc_bytes"] = peak - current.start_traced
+            current.counters["alloc_blocks"] = (sys.getallocatedblocks()
+                                                - current.start_blocks)
+        _records.append({
+            "name": current.name,
+            "start_us": current.start_ns / 1000,
+            "duration_us": (end_ns - current.start_ns) / 1000,
+            "depth": current.depth,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "counters": current.counters,
+        })
+
+def instrumented(name: str = None):
+    """Decorator recording each call of a function as a stage. The stage
+    name defaults to the qualified function name."""
+    def decorate(func):
+        stage_name = name or func.__qualname__
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            with stage(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def count(**counters):
+    """Adds to the counters of the innermost running stage, if any.
+    Arguments which are expensive to compute should be guarded by
+    "if instrumentation.enabled:"."""
+    if not enabled:
+        return
+    stack = _stack()
+    if stack:
+        stage_counters = stack[-1].counters
+        for key, value in counters.items():
+            stage_counters[key] = stage_counters.get(key, 0) + value
+
+def records() -> list:
+    """Returns all records as list of dicts with the keys:
+        name, start_us, duration_us, depth, pid, tid, counters
+    Records are in order of stage completion, i.e. inner stages first.
+    """
+    return list(_records)
+
+def summary() -> dict:
+    """Totals per stage name: dict of name to dict of
+    calls, total_us and the sums of all counters"""
+    totals = {}
+    for record in _records:
+        total = totals.setdefault(record["name"],
+                                  {"calls": 0, "total_us": 0.0})
+        total["calls"] += 1
+        total["total_us"] += record["duration_us"]
+        for key, value in record["counters"].items():
+            if key == "peak_alloc_bytes":
+                total[key] = max(total.get(key, 0), value)
+            else:
+                total[key] = total.get(key, 0) + value
+    return totals
+
+def chrome_trace(filename: str = None) -> dict:
+    """Returns the records in Chrome trace event format and writes them
+    as JSON to filename, if given"""
+    trace = {
+        "traceEvents": [
+            {"name": record["name"], "ph": "X",
+             "ts": record["start_us"], "dur": record["duration_us"],
+             "pid": record["pid"], "tid": record["tid"],
+             "args": record["counters"]}
+            for record in _records
+        ],
+        "displayTimeUnit": "ms",
+    }
+    if filename is not None:
+        import json
+        with open(filename, "w") as f:
+            json.dump(trace, f)
+    return trace
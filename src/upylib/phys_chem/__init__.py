@@ -0,0 +1,15 @@
+"""Physical and chemical properties and calculations"""
+from upylib import lazy_loader
+
+__getattr__, __dir__ = lazy_loader(
+    __name__,
+    ("air_humidity", "lookup_table", "parameter_sweep", "pipe_network",
+     "pressure_loss", "water_glycol_density_c_th",
+     "wheatstone_rtd_pt100_pt1000"),
+    {
+        "PipeNetwork": "pipe_network",
+        "UniformTable": "lookup_table",
+        "sweep": "parameter_sweep",
+        "property_table": "water_glycol_density_c_th",
+        "bridge_temperature": "wheatstone_rtd_pt100_pt1000",
+    })
@@ -1,6 +1,28 @@
 # Source: https://www.wufi-forum.com/viewtopic.php?t=1615
 # Source: https://de.wikipedia.org/wiki/Sättigungsdampfdruck
+#
+# The scalar functions assert on the definition range. The *_array
+# variants broadcast over numpy arrays of rh, t and p and return NaN
+# outside of the definition range instead, see valid_range(). They use the
+# same expressions and give bit-identical results.
 import math
+import numpy as np
+
+# Magnus formula coefficients
+C1 = 6.112 # hPa
+C2 = 17.62 # 1
+C3 = 243.12 # °C
+# Definition range of the Magnus formula coefficients
+T_MIN = -45.0 # °C
+T_MAX = 60.0 # °C
+# molar mass of water
+M_water = 18.016
+# molar mass of dry air (standard atmosphere)
+M_dry_air = 28.9644
+# universal gas constant
+R_gas = 8314.3
+# absolute temperature at 0°C
+T_zero = 273.15
 
 def water_p_sat(t):
     """Saturated water vapour pressure in hPa
@@ -9,9 +31,6 @@ def water_p_sat(t):
         t: Temperture in °C
     """
     assert -45 <= t <=60, "Definition range is -45°C ... 60°C only!"
-    C1 = 6.112 # hPa
-    C2 = 17.62 # 1
-    C3 = 243.12 # °C
     return C1 * math.exp((C2*t)/(C3+t))
 
 def air_p_w(rh, t):
@@ -27,9 +46,6 @@ def air_dew_point_pw(p_w):
     (inverse of magnus formula)
         p_w: Partial pressure of water in humid air, in hPa
     """
-    C1 = 6.112 # hPa
-    C2 = 17.62 # 1
-    C3 = 243.12 # °C
     return C3 * math.log(p_w/C1) / (C2 - math.log(p_w/C1))
 
 def air_dew_point(rh, t):
@@ -45,12 +61,6 @@ def air_abs_hum_vol(rh, t):
         rh: relative humidity in %
         t: temperature in °C
     """
-    # molar mass of water
-    M_water = 18.016
-    # universal gas constant
-    R_gas = 8314.3
-    # absolute temperature at 0°C
-    T_zero = 273.15
     return 1E5 * M_water / R_gas * air_p_w(rh, t)/(t + T_zero)
 
 def air_x_w(rh, t, p=1013):
@@ -64,8 +74,96 @@ def air_x_w(rh, t, p=1013):
     # x_water = n_water*M_water / (n_water*M_water + n_air*M_dry_air)
     # n_air = n_water * (1-y_water)/y_water = n_water * (p/p_water - 1)
     # x_water = M_water / (M_water + (p/p_water - 1)*M_dry_air)
-    # molar mass of water
-    M_water = 18.016
-    # molar mass of dry air (standard atmosphere)
-    M_dry_air = 28.9644
-    return 1000 * M_water / (M_water + (p/air_p_w(rh, t) - 1) * M_dry_air)
\ No newline at end of file
+    return 1000 * M_water / (M_water + (p/air_p_w(rh, t) - 1) * M_dry_air)
+
+
+def _elementwise(func):
+    """Applies func of the math module to each element of an array
+
+    np.exp() and np.log() use their own SIMD implementations, which differ
+    from the C library in the last bit for a few percent of the arguments.
+    """
+    ufunc = np.frompyfunc(func, 1, 1)
+    return lambda x: np.asarray(ufunc(x), dtype=float)
+
+_exp = _elementwise(math.exp)
+_log = _elementwise(math.log)
+
+def valid_range(rh, t, p=1013):
+    """Boolean mask of elements inside the definition range
+    0 <= rh <= 100, -45°C <= t <= 60°C and p > 0, broadcast over all inputs
+    """
+    return (rh >= 0) & (rh <= 100) & (t >= T_MIN) & (t <= T_MAX) & (p > 0)
+
+def _masked(valid, x):
+    """Float array of x with NaN where not valid, which then propagates
+    through all calculations without floating point warnings"""
+    return np.where(valid, x, np.nan)
+
+def _p_sat(t):
+    return C1 * _exp((C2*t)/(C3+t))
+
+def _dew_point_pw(p_w):
+    # NaN for p_w <= 0, the dew point of dry air is not defined
+    log_p_rel = _log(_masked(p_w > 0, p_w)/C1)
+    return C3 * log_p_rel / (C2 - log_p_rel)
+
+def _abs_hum_vol(p_w, t):
+    return 1E5 * M_water / R_gas * p_w/(t + T_zero)
+
+def _x_w(p_w, p):
+    # 0 for dry air, where air_x_w() divides by zero
+    dry = p_w == 0
+    p_w = _masked(~dry, p_w)
+    return np.where(dry, 0.0,
+                    1000 * M_water / (M_water + (p/p_w - 1) * M_dry_air))
+
+def water_p_sat_array(t):
+    """Array version of water_p_sat(), NaN outside of -45°C...60°C"""
+    return _p_sat(_masked((t >= T_MIN) & (t <= T_MAX), t))
+
+def air_p_w_array(rh, t):
+    """Array version of air_p_w(), NaN outside of valid_range()"""
+    return rh/100.0 * water_p_sat_array(_masked(valid_range(rh, t), t))
+
+def air_dew_point_pw_array(p_w):
+    """Array version of air_dew_point_pw(), NaN for p_w <= 0"""
+    return _dew_point_pw(p_w)
+
+def air_dew_point_array(rh, t):
+    """Array version of air_dew_point(), NaN outside of valid_range()
+    and for rh = 0"""
+    return _dew_point_pw(air_p_w_array(rh, t))
+
+def air_abs_hum_vol_array(rh, t):
+    """Array version of air_abs_hum_vol(), NaN outside of valid_range()"""
+    return _abs_hum_vol(air_p_w_array(rh, t), t)
+
+def air_x_w_array(rh, t, p=1013):
+    """Array version of air_x_w(), NaN outside of valid_range(), 0 for
+    rh = 0"""
+    return _x_w(air_p_w_array(rh, _masked(p > 0, t)), p)
+
+def air_properties(rh, t, p=1013):
+    """All humid air properties from one evaluation of the Magnus formula
+
+    Broadcasts over rh, t and p. Returns a dict of arrays:
+        valid:       Mask of elements inside valid_range(), others are NaN
+        p_sat:       Saturated water vapour pressure in hPa
+        p_w:         Partial pressure of water in hPa
+        dew_point:   Dew point temperature in °C, NaN for rh = 0
+        abs_hum_vol: Per-volume absolute humidity in g/m³
+        x_w:         Water mass fraction in g/kg, 0 for rh = 0
+    """
+    valid = valid_range(rh, t, p)
+    t = _masked(valid, t)
+    p_sat = _p_sat(t)
+    p_w = rh/100.0 * p_sat
+    return {
+        "valid": valid,
+        "p_sat": p_sat,
+        "p_w": p_w,
+        "dew_point": _dew_point_pw(p_w),
+        "abs_hum_vol": _abs_hum_vol(p_w, t),
+        "x_w": _x_w(p_w, p),
+    }
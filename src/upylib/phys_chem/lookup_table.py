@@ -0,0 +1,83 @@
+"""Lookup tables for fast evaluation of tabulated or expensive functions
+
+2026-10 Ulrich Lukas
+"""
+import math
+import numpy as np
+
+class UniformTable():
+    """Linear interpolation in a table with uniform grid spacing
+
+    The table index is calculated directly from the argument, instead of
+    the binary search done by np.interp(). Python float or int arguments
+    are evaluated without numpy overhead.
+
+    bounds sets the policy for arguments outside of the table range:
+        "clip":  Use the first or last table value, same as np.interp()
+        "nan":   Return NaN
+        "raise": Raise a ValueError
+    """
+    def __init__(self, x_start, x_step, values, bounds="clip"):
+        assert bounds in ("clip", "nan", "raise"), f"Invalid bounds: {bounds}"
+        assert len(values) >= 2, "Table needs at least two values"
+        self.x_start = float(x_start)
+        self.x_step = float(x_step)
+        self.x_end = self.x_start + (len(values) - 1) * self.x_step
+        self.values = np.array(values, dtype=float)
+        self.bounds = bounds
+        self._slopes = np.diff(self.values)
+        self._inv_step = 1 / self.x_step
+        self._i_max = len(values) - 2
+        self._values_list = self.values.tolist()
+        self._slopes_list = self._slopes.tolist()
+
+    @classmethod
+    def from_function(cls, func, x_min, x_max, x_step, bounds="clip"):
+        """Table of func(x) sampled from x_min to x_max (included)"""
+        n_steps = math.ceil((x_max - x_min) / x_step - 1e-9)
+        x = x_min + x_step * np.arange(n_steps + 1)
+        return cls(x_min, x_step, func(x), bounds)
+
+    @classmethod
+    def from_points(cls, x_ref, y_ref, x_step=None, bounds="clip"):
+        """Table of the piecewise linear interpolation of points (x_ref, y_ref)
+
+        If x_step is None, x_ref must already be uniformly spaced and
+        the table reproduces the piecewise linear interpolation exactly.
+        """
+        x_ref = np.asarray(x_ref, dtype=float)
+        if x_step is None:
+            steps = np.diff(x_ref)
+            assert np.allclose(steps, steps[0]), (
+                "x_ref is not uniformly spaced, x_step is required")
+            return cls(x_ref[0], steps[0], y_ref, bounds)
+        return cls.from_function(lambda x: np.interp(x, x_ref, y_ref),
+                                 x_ref[0], x_ref[-1], x_step, bounds)
+
+    def __call__(self, x):
+        if isinstance(x, (float, int)):
+            pos = (x - self.x_start) * self._inv_step
+            if not 0 <= pos <= self._i_max + 1:
+                if self.bounds == "raise":
+                    raise ValueError(f"Argument {x} outside of table range "
+                                     f"{self.x_start}...{self.x_end}")
+                if self.bounds == "nan" or math.isnan(pos):
+                    return math.nan
+                pos = 0 if pos < 0 else self._i_max + 1
+            i = min(int(pos), self._i_max)
+            return self._values_list[i] + (pos - i) * self._slopes_list[i]
+        pos = (np.asarray(x, dtype=float) - self.x_start) * self._inv_step
+        outside = ~((pos >= 0) & (pos <= self._i_max + 1))
+        if not outside.any():
+            i = np.minimum(pos.astype(np.intp), self._i_max)
+            return self.values[i] + (pos - i) * self._slopes[i]
+        if self.bounds == "raise":
+            raise ValueError(f"{np.count_nonzero(outside)} arguments "
+                             f"outside of table range "
+                             f"{self.x_start}...{self.x_end}")
+        # NaN arguments always give NaN, as for np.interp()
+        invalid = outside if self.bounds == "nan" else np.isnan(pos)
+        pos = np.clip(np.where(invalid, 0.0, pos), 0, self._i_max + 1)
+        i = np.minimum(pos.astype(np.intp), self._i_max)
+        result = self.values[i] + (pos - i) * self._slopes[i]
+        return np.where(invalid, np.nan, result)
@@ -0,0 +1,260 @@
+"""Parameter sweeps of vectorized models over grids of parameter values
+
+sweep() evaluates a model for all combinations of the parameter values,
+i.e. the cartesian product of the parameter grids. The grid points are
+processed in chunks of bounded size by a pool of worker processes, which
+write the results directly into one memory-mapped .npy file per output
+in the result directory. Output arrays have the shape of the grid, with
+one axis per parameter in the order given.
+
+Completed chunks are recorded in the result directory. A sweep which was
+interrupted is resumed by calling sweep() again with the same arguments,
+only the missing chunks are then evaluated.
+
+Example, pressure loss of 1 m of pipe for 1e7 combinations:
+
+    result = sweep(pipe_loss_model, "sweep_pipe_loss",
+                   Di_mm=np.linspace(8, 40, 65),
+                   Q_l_min=np.linspace(0.5, 60, 480),
+                   theta=np.linspace(-20, 80, 101),
+                   vol_percent=[0, 20, 40, 60])
+    result["delta_p_mbar"][i_Di, i_Q, i_theta, i_vol]
+
+Fixed model arguments can be set using functools.partial(), e.g.
+functools.partial(pipe_loss_model, l_m=14). The model must be picklable,
+i.e. defined at module level, for running in worker processes.
+
+2026-10 Ulrich Lukas
+"""
+import functools
+import json
+import logging
+import os
+import numpy as np
+
+from upylib import instrumentation
+from upylib.phys_chem.pressure_loss import (
+    v_flow, reynolds, pipe_friction_lambda, pipe_zeta, viscosity_water_20)
+from upylib.phys_chem.water_glycol_density_c_th import property_table
+
+logger = logging.getLogger(__name__)
+
+# Increment when the layout of the result directory changes
+SWEEP_VERSION = 1
+
+
+@instrumentation.instrumented()
+def sweep(model, directory, chunk_size=1 << 18, workers=None, resume=True,
+          **grid):
+    """Evaluates model(**parameters) for all combinations of the values
+    of the parameter grids
+
+    Parameters:
+        model: function taking the parameters as keyword arguments, as
+               1-D arrays of equal length, and returning a dict of output
+               names and arrays of the same length (or scalars)
+        directory: result directory, created if it does not exist
+        chunk_size: number of grid points evaluated per model call. Memory
+                    use per worker is about chunk_size times the number of
+                    parameters, outputs and temporary arrays of the model
+                    times 8 bytes.
+        workers: number of worker processes, defaulting to the number of
+                 CPUs. With 0, all chunks are evaluated in this process.
+        resume: continue a sweep with the same grid in directory,
+                otherwise any previous result is overwritten
+        grid: parameter names and sequences of their values
+
+    Returns the result, see load_sweep().
+    """
+    parameters = {name: np.asarray(values, dtype=float).reshape(-1)
+                  for name, values in grid.items()}
+    shape = tuple(len(values) for values in parameters.values())
+    n_points = int(np.prod(shape))
+    if n_points == 0:
+        raise ValueError("Parameter grid is empty")
+    n_chunks = -(-n_points // chunk_size)
+    # The outputs and their types are taken from the first grid point
+    first = _chunk_parameters(parameters, shape, 0, 1)
+    outputs = {name: np.asarray(values).dtype.str
+               for name, values in model(**first).items()}
+    description = {
+        "version": SWEEP_VERSION,
+        "model": _model_name(model),
+        "parameters": {name: values.tolist()
+                       for name, values in parameters.items()},
+        "outputs": outputs,
+        "chunk_size": chunk_size,
+    }
+
+    os.makedirs(directory, exist_ok=True)
+    description_file = os.path.join(directory, "sweep.json")
+    done_file = os.path.join(directory, "chunks_done.npy")
+    if resume and os.path.exists(description_file):
+        with open(description_file) as f:
+            if json.load(f) != description:
+                raise ValueError(f"{directory} contains a different sweep, "
+                                 "use resume=False to overwrite it")
+        done = np.load(done_file, mmap_mode="r+")
+    else:
+        # Description file is written last, marking the directory complete
+        if os.path.exists(description_file):
+            os.remove(description_file)
+        for name, dtype in outputs.items():
+            np.lib.format.open_memmap(os.path.join(directory, name + ".npy"),
+                                      "w+", np.dtype(dtype), shape)
+        done = np.lib.format.open_memmap(done_file, "w+", np.uint8, (n_chunks,))
+        with open(description_file, "w") as f:
+            json.dump(description, f)
+
+    todo = np.flatnonzero(done == 0).tolist()
+    logger.info("Sweep of %d points in %d chunks, %d chunks to do",
+                n_points, n_chunks, len(todo))
+    instrumentation.count(points=n_points, chunks=len(todo))
+    args = [(model, directory, parameters, shape, i * chunk_size,
+             min((i + 1) * chunk_size, n_points)) for i in todo]
+    if workers == 0:
+        for i, chunk_args in zip(todo, args):
+            _evaluate_chunk(*chunk_args)
+            done[i] = 1
+            done.flush()
+    else:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        with ProcessPoolExecutor(workers) as executor:
+            futures = {executor.submit(_evaluate_chunk, *chunk_args): i
+                       for i, chunk_args in zip(todo, args)}
+            try:
+                for future in as_completed(futures):
+                    future.result()
+                    done[futures[future]] = 1
+                    done.flush()
+            except BaseException:
+                # Chunks not started yet are evaluated on resume
+                for future in futures:
+                    future.cancel()
+                raise
+    return load_sweep(directory)
+
+def _model_name(model):
+    """Name of the model function including the arguments set by
+    functools.partial(), for checking that a resumed sweep is the same"""
+    if isinstance(model, functools.partial):
+        args = [repr(arg) for arg in model.args] + [
+            f"{key}={value!r}" for key, value in model.keywords.items()]
+        return f"{_model_name(model.func)}({', '.join(args)})"
+    model_type = model if hasattr(model, "__qualname__") else type(model)
+    return f"{model_type.__module__}.{model_type.__qualname__}"
+
+def _chunk_parameters(parameters, shape, start, stop):
+    """Parameter values of the grid points start...stop-1, in C order"""
+    indices = np.unravel_index(np.arange(start, stop), shape)
+    return {name: values[index]
+            for (name, values), index in zip(parameters.items(), indices)}
+
+def _evaluate_chunk(model, directory, parameters, shape, start, stop):
+    results = model(**_chunk_parameters(parameters, shape, start, stop))
+    for name, values in results.items():
+        out = np.load(os.path.join(directory, name + ".npy"), mmap_mode="r+")
+        out.reshape(-1)[start:stop] = values
+        out.flush()
+
+def load_sweep(directory, mode="r"):
+    """Result of sweep() as a dict with keys:
+        parameters: dict of parameter names and 1-D arrays of their values
+        complete:   True if all chunks were evaluated
+        outputs... each output as np.memmap of the grid shape, opened with
+                   mode "r" (read-only) or "r+"
+    """
+    with open(os.path.join(directory, "sweep.json")) as f:
+        description = json.load(f)
+    assert description["version"] == SWEEP_VERSION, (
+        f"Unsupported sweep version: {description['version']}")
+    result = {
+        "parameters": {name: np.array(values) for name, values
+                       in description["parameters"].items()},
+        "complete": bool(np.load(os.path.join(directory, "chunks_done.npy"),
+                                 mmap_mode="r").all()),
+    }
+    for name in description["outputs"]:
+        result[name] = np.load(os.path.join(directory, name + ".npy"),
+                               mmap_mode=mode)
+    return result
+
+def to_parquet(directory, filename, row_group_size=1 << 20):
+    """Writes the result of sweep() as a Parquet table, with one row per
+    grid point and columns for the parameters and outputs.
+
+    The table is written in row groups, memory use is bounded by
+    row_group_size. This requires the optional pyarrow package.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    result = load_sweep(directory)
+    parameters = result["parameters"]
+    shape = tuple(len(values) for values in parameters.values())
+    outputs = [name for name in result
+               if name not in ("parameters", "complete")]
+    n_points = int(np.prod(shape))
+    writer = None
+    try:
+        for start in range(0, n_points, row_group_size):
+            stop = min(start + row_group_size, n_points)
+            columns = _chunk_parameters(parameters, shape, start, stop)
+            for name in outputs:
+                columns[name] = np.asarray(result[name].reshape(-1)[start:stop])
+            table = pa.table(columns)
+            if writer is None:
+                writer = pq.ParquetWriter(filename, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def pipe_loss_model(Di_mm, Q_l_min, theta, vol_percent=0, l_m=1.0,
+                    k_mm=0.0015, viscosity_dyn=viscosity_water_20):
+    """Pipe flow model for sweep(), see pipe_delta_p_mbar()
+
+    Parameters:
+        Di_mm: Inner diameter in mm
+        Q_l_min: Flow in liters per minute
+        theta: Fluid temperature in °C. All outputs are NaN for
+               temperatures outside of the property tables, e.g. below
+               0°C for water.
+        vol_percent: Glycol concentration by volume, see property_table()
+        l_m: length in meters
+        k_mm: Absolute roughness in mm
+        viscosity_dyn: fluid dynamic viscosity in Pa*s. This does not
+                       depend on temperature or glycol concentration, as
+                       there is no viscosity data here yet.
+
+    Returns a dict of arrays:
+        rho: density in kg/m³
+        c_th: specific heat capacity in J/kg/K
+        v_f: flow in m/s
+        Re: reynolds number
+        friction_lambda: Darcy friction factor
+        delta_p_mbar: pressure loss in mBar
+    """
+    theta = np.asarray(theta, dtype=float)
+    vol_percent = np.broadcast_to(vol_percent, theta.shape)
+    rho = np.empty(theta.shape)
+    c_th = np.empty(theta.shape)
+    for concentration in np.unique(vol_percent):
+        mask = vol_percent == concentration
+        rho[mask] = property_table("rho", concentration.item(),
+                                   bounds="nan")(theta[mask])
+        c_th[mask] = property_table("c_th", concentration.item(),
+                                    bounds="nan")(theta[mask])
+    rho *= 1000
+    v_f = v_flow(Q_l_min, Di_mm)
+    Re = reynolds(v_f, rho, Di_mm, viscosity_dyn)
+    friction_lambda = pipe_friction_lambda(Re, k_mm / Di_mm)
+    zeta = pipe_zeta(l_m, Di_mm, friction_lambda)
+    return {
+        "rho": rho,
+        "c_th": c_th,
+        "v_f": v_f,
+        "Re": Re,
+        "friction_lambda": friction_lambda,
+        "delta_p_mbar": 1/100 * zeta * rho/2.0 * v_f**2,
+    }
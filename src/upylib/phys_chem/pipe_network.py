@@ -0,0 +1,266 @@
+"""Hydraulic network of pipe segments and fittings
+
+Solves branch flows and node pressures of networks of parallel and series
+branches, e.g. cooling loops, using the global gradient (Todini-Pilati)
+Newton method. Each Newton step solves one sparse symmetric system for the
+node pressures, all segments are evaluated vectorized per step.
+
+Units at the interface are the same as for pipe_delta_p_mbar():
+flows in liters per minute, pressures in mbar, lengths in m and diameters
+in mm. Internally, SI units are used.
+
+Example, a pump driving two parallel branches:
+
+    net = PipeNetwork()
+    net.add_segment("supply", "a", l_m=2, Di_mm=25)
+    net.add_segment("a", "b", l_m=5, Di_mm=16, zeta=1.5)
+    net.add_segment("a", "b", l_m=8, Di_mm=20, zeta=3.0)
+    net.add_segment("b", "return", l_m=2, Di_mm=25)
+    net.add_segment("return", "supply", l_m=0, Di_mm=25, dp_pump_mbar=250)
+    net.set_pressure("return", 1000)
+    Q_l_min, p_mbar = net.solve()
+
+2026-10 Ulrich Lukas
+"""
+import logging
+import math
+import numpy as np
+
+from upylib import instrumentation
+from upylib.phys_chem.pressure_loss import (
+    v_flow, reynolds, pipe_friction_lambda, pipe_zeta,
+    viscosity_water_20, rho_water_20)
+
+logger = logging.getLogger(__name__)
+
+
+class PipeNetwork():
+    """Graph of pipe segments and fittings connecting named nodes
+
+    Segments are directed from node_from to node_to, flows in the opposite
+    direction are negative. Nodes can be any hashable names and are created
+    by add_segment(). At least one node per connected part of the network
+    must have a fixed pressure set by set_pressure(), all other nodes
+    are solved for. External inflows (positive) or outflows (negative)
+    are set by set_inflow().
+
+    Topology and geometry are fixed after the first call of solve().
+    Pressures, inflows, pump pressures and fluid properties can be
+    changed between calls. solve() starts from the previous solution
+    by default, which saves most iterations for operating point sweeps.
+    """
+    def __init__(self):
+        self.nodes = {}
+        self._node_from = []
+        self._node_to = []
+        self._l_m = []
+        self._Di_mm = []
+        self._k_mm = []
+        self._zeta = []
+        self._dp_pump_mbar = []
+        self._p_fixed_mbar = {}
+        self._inflow_l_min = {}
+        self._compiled = False
+        # Solution of the last call of solve()
+        self.Q_l_min = None
+        self.p_mbar = None
+        self.iterations = 0
+
+    @property
+    def n_segments(self):
+        return len(self._l_m)
+
+    def node_index(self, node):
+        """Returns the index of a node in the p_mbar array, creating the node
+        if it does not exist"""
+        return self.nodes.setdefault(node, len(self.nodes))
+
+    def add_segment(self, node_from, node_to, l_m, Di_mm, k_mm=0.0015,
+                    zeta=0.0, dp_pump_mbar=0.0):
+        """Adds a pipe segment and/or fittings between two nodes
+
+        Parameters:
+            l_m: length in meters, 0 for fittings only
+            Di_mm: Inner diameter in mm
+            k_mm: Absolute roughness in mm
+            zeta: sum of zeta values of fittings in this segment
+            dp_pump_mbar: pressure increase in flow direction by a pump
+
+        Returns the segment index in the Q_l_min array.
+        """
+        assert not self._compiled, "Network topology is fixed after solve()"
+        assert node_from != node_to, "Segment must connect two different nodes"
+        assert Di_mm > 0, "Inner diameter must be positive"
+        self._node_from.append(self.node_index(node_from))
+        self._node_to.append(self.node_index(node_to))
+        self._l_m.append(l_m)
+        self._Di_mm.append(Di_mm)
+        self._k_mm.append(k_mm)
+        self._zeta.append(zeta)
+        self._dp_pump_mbar.append(dp_pump_mbar)
+        return self.n_segments - 1
+
+    def set_pressure(self, node, p_mbar):
+        """Sets a fixed pressure for a node, or removes it for p_mbar=None"""
+        index = self.nodes[node]
+        if p_mbar is None:
+            self._p_fixed_mbar.pop(index, None)
+        else:
+            self._p_fixed_mbar[index] = p_mbar
+
+    def set_inflow(self, node, Q_l_min):
+        """Sets the external flow into a node, negative for outflow"""
+        self._inflow_l_min[self.nodes[node]] = Q_l_min
+
+    def set_pump(self, segment, dp_mbar):
+        """Sets the pump pressure increase of a segment"""
+        self._dp_pump_mbar[segment] = dp_mbar
+        if self._compiled:
+            self.dp_pump_mbar[segment] = dp_mbar
+
+    def _compile(self):
+        """Converts the segment lists into arrays and builds the sparse
+        incidence matrix of shape (n_segments, n_nodes)"""
+        from scipy import sparse
+        n = self.n_segments
+        assert n > 0, "Network has no segments"
+        self.l_m = np.array(self._l_m, dtype=float)
+        self.Di_mm = np.array(self._Di_mm, dtype=float)
+        self.eD = np.array(self._k_mm, dtype=float) / self.Di_mm
+        self.zeta = np.array(self._zeta, dtype=float)
+        self.dp_pump_mbar = np.array(self._dp_pump_mbar, dtype=float)
+        # Flow cross-section in m²
+        self.A_m2 = math.pi / 4 * (self.Di_mm / 1000) ** 2
+        rows = np.repeat(np.arange(n), 2)
+        cols = np.column_stack((self._node_from, self._node_to)).ravel()
+        values = np.tile([1.0, -1.0], n)
+        self._incidence = sparse.csr_matrix(
+            (values, (rows, cols)), shape=(n, len(self.nodes)))
+        self._compiled = True
+
+    def segment_delta_p(self, Q_m3_s, rho, viscosity_dyn):
+        """Pressure loss in Pa in flow direction and its derivative
+        d(delta_p)/dQ for all segments, for flows in m³/s
+
+        Newton iteration needs pressure losses continuous in Q. Between
+        Re = 2000 and 4000, the friction factor is therefore linearly
+        interpolated between the laminar value and the Colebrook-White
+        value at Re = 4000. The friction factor derivative is included
+        exactly, for turbulent flow from the implicit Colebrook-White
+        formula.
+        """
+        Q_l_min = np.abs(Q_m3_s) * 60e3
+        v_f = v_flow(Q_l_min, self.Di_mm)
+        # Lower limit avoids division by zero for zero flow. The friction
+        # term still vanishes for zero flow, its slope is added below.
+        Re = np.maximum(reynolds(v_f, rho, self.Di_mm, viscosity_dyn), 1e-300)
+        Re_turbulent = np.maximum(Re, 4000.0)
+        lambda_turbulent = pipe_friction_lambda(Re_turbulent, self.eD)
+        # s = dln(lambda)/dln(Re)
+        x = 1 / np.sqrt(lambda_turbulent)
+        c = 2 / math.log(10) * 2.51 / (Re_turbulent * 10 ** (-x / 2))
+        s = -2 * c / (1 + c)
+        friction_lambda = lambda_turbulent
+        transition = Re < 4000
+        lambda_slope = (lambda_turbulent[transition] - 64 / 2000) / 2000
+        friction_lambda[transition] = (64 / 2000 + lambda_slope
+                                       * (Re[transition] - 2000))
+        s[transition] = (lambda_slope * Re[transition]
+                         / friction_lambda[transition])
+        laminar = Re < 2000
+        friction_lambda[laminar] = 64 / Re[laminar]
+        s[laminar] = -1.0
+        zeta_pipe = pipe_zeta(self.l_m, self.Di_mm, friction_lambda)
+        dynamic_pressure = rho / 2 * v_f**2
+        delta_p = (zeta_pipe + self.zeta) * dynamic_pressure
+        slope = ((2 + s) * zeta_pipe + 2 * self.zeta) * dynamic_pressure / (
+            np.abs(Q_m3_s) + 1e-300)
+        # Lower limit is the laminar slope for zero flow,
+        # 32 * viscosity * l / (Di² * A), or the slope of zeta = 1 at 1 cm/s
+        # for segments without pipe length. This only affects the
+        # convergence, not the solution, and also covers segments without
+        # losses, e.g. pumps.
+        slope_0 = np.where(self.l_m > 0,
+                           32 * viscosity_dyn * self.l_m
+                           / ((self.Di_mm / 1000) ** 2 * self.A_m2),
+                           rho * 0.01 / self.A_m2)
+        slope = np.maximum(slope, slope_0)
+        return np.copysign(delta_p, Q_m3_s), slope
+
+    @instrumentation.instrumented()
+    def solve(self, rho=rho_water_20, viscosity_dyn=viscosity_water_20,
+              warm_start=True, rel_tol=1e-9, max_iter=100):
+        """Solves branch flows and node pressures
+
+        Parameters:
+            rho: fluid density in kg/m³ (!) (1000 for water)
+            viscosity_dyn: fluid dynamic viscosity in Pa*s = kg*m/s
+            warm_start: start from the previous solution, if available
+            rel_tol: convergence limit for the largest flow change
+                     relative to the largest flow
+            max_iter: maximum number of Newton steps
+
+        Returns arrays of segment flows in l/min and node pressures in mbar,
+        indexed by segment and node index. These are also stored in the
+        Q_l_min and p_mbar attributes.
+        """
+        from scipy import sparse
+        from scipy.sparse.linalg import spsolve
+        if not self._compiled:
+            self._compile()
+        n_nodes = len(self.nodes)
+        fixed = np.zeros(n_nodes, dtype=bool)
+        p = np.zeros(n_nodes)
+        if not self._p_fixed_mbar:
+            raise ValueError("At least one node must have a fixed pressure")
+        if max_iter < 1:
+            raise ValueError("max_iter must be at least 1")
+        for index, p_mbar in self._p_fixed_mbar.items():
+            fixed[index] = True
+            p[index] = p_mbar * 100
+        inflow = np.zeros(n_nodes)
+        for index, Q_l_min in self._inflow_l_min.items():
+            inflow[index] = Q_l_min / 60e3
+        free = ~fixed
+        A_free = self._incidence[:, free]
+        A_free_T = A_free.T.tocsr()
+        # Pressure difference from fixed nodes and pumps, in flow direction
+        p_drive = self._incidence[:, fixed] @ p[fixed] + self.dp_pump_mbar * 100
+
+        if warm_start and self.Q_l_min is not None:
+            Q = self.Q_l_min / 60e3
+        else:
+            # Velocity of 1 m/s in all segments as a neutral starting point
+            Q = self.A_m2.copy()
+        for self.iterations in range(1, max_iter + 1):
+            delta_p, slope = self.segment_delta_p(Q, rho, viscosity_dyn)
+            # Linearized segment equations:
+            #     slope * Q_new - A_free @ p_free = p_drive - delta_p + slope * Q
+            # together with A_free.T @ Q_new = inflow[free], eliminating Q_new:
+            b = (p_drive - delta_p) / slope + Q
+            D = sparse.diags(1 / slope)
+            M = (A_free_T @ D @ A_free).tocsc()
+            # Fill-reducing ordering for the symmetric structure of M
+            p_free = spsolve(M, inflow[free] - A_free_T @ b,
+                             permc_spec="MMD_AT_PLUS_A")
+            Q_new = b + (A_free @ p_free) / slope
+            step = np.abs(Q_new - Q).max()
+            Q = Q_new
+            if step <= rel_tol * np.abs(Q).max():
+                break
+        else:
+            logger.warning("Network solution not converged after %d steps, "
+                           "relative flow change: %g",
+                           max_iter, step / np.abs(Q).max())
+        logger.debug("Network solution took %d steps", self.iterations)
+        instrumentation.count(iterations=self.iterations,
+                              segments=self.n_segments)
+        p[free] = p_free
+        self.Q_l_min = Q * 60e3
+        self.p_mbar = p / 100
+        return self.Q_l_min, self.p_mbar
+
+    def pressures(self):
+        """Returns a dict of node names and pressures in mbar of the last
+        solution"""
+        return {node: self.p_mbar[index] for node, index in self.nodes.items()}
@@ -1,5 +1,10 @@
 import math
-import fluids
+import logging
+import numpy as np
+
+from upylib import instrumentation
+
+logger = logging.getLogger(__name__)
 
 viscosity_water_20 = 1001.61e-6
 rho_water_20 = 998.206
@@ -25,40 +30,158 @@ def reynolds(v_f, rho, Di_mm, viscosity_dyn):
     """
     return rho * v_f * Di_mm/1000.0 / viscosity_dyn
 
-def pipe_friction_lambda(Re, eD, rel_tol=1e-12):
+@instrumentation.instrumented()
+def pipe_friction_lambda(Re, eD, rel_tol=1e-12, max_iter=1000, return_iterations=False):
     """Darcy friction factor for flow in smooth and rough conduits
     
     Parameters:
         Re: reynolds number
         eD: Pipe relative roughness eD = k/Di with absolute roughness k
+        rel_tol: relative tolerance for convergence of the iteration
+        max_iter: maximum number of iterations
+        return_iterations: additionally return the number of iterations
     
     Uses the Colebrook and White formula according to:
     https://de.wikipedia.org/wiki/Rohrreibungszahl
-    
-    This iterates a thousand times maximum; convergence should happen much sooner than that
+
+    Re and eD can be scalars or numpy arrays of any broadcastable shape.
+    The result is a float for scalar inputs, an ndarray otherwise.
+    Python or numpy float scalars are evaluated with the math module,
+    which avoids the numpy overhead for single values.
+    Laminar elements (Re < 2300) are calculated directly, non-positive
+    Reynolds numbers give NaN.
+
+    For turbulent flow, the explicit Serghides approximation is used as
+    starting value for a Newton iteration, which then converges within
+    two cycles for the usual range of Re and eD. Converged elements are
+    not changed by further cycles, the number of cycles per element is
+    available with return_iterations=True. Elements not converged after
+    max_iter cycles are logged as a warning. The total number of cycles
+    is recorded by the instrumentation, see upylib.instrumentation.
     """
-    def inv_lambda_sqrt_next(inv_lambda_sqrt_prev, Re, eD):
-        return -2 * math.log10(inv_lambda_sqrt_prev * 2.51 / Re + eD/3.71)
-    if math.isclose(Re, rel_tol):
-        print("Reynolds number is close to zero, this is not plausible")
-        return math.nan
+    if isinstance(Re, (float, int)) and isinstance(eD, (float, int)):
+        friction_lambda, iterations = _colebrook_white_scalar(
+            Re, eD, rel_tol, max_iter)
+        if instrumentation.enabled:
+            instrumentation.count(elements=1, iterations=iterations)
+        if return_iterations:
+            return friction_lambda, iterations
+        return friction_lambda
+    scalar_input = np.ndim(Re) == 0 and np.ndim(eD) == 0
+    Re, eD = np.broadcast_arrays(np.asarray(Re, dtype=float),
+                                 np.asarray(eD, dtype=float))
+    friction_lambda = np.empty(Re.shape)
+    iterations = np.empty(Re.shape, dtype=int)
+    Re_flat, eD_flat = Re.reshape(-1), eD.reshape(-1)
+    lambda_flat, iterations_flat = friction_lambda.reshape(-1), iterations.reshape(-1)
+    # Blocks keep the temporary arrays small enough to stay in the CPU cache
+    not_converged = 0
+    for start in range(0, Re.size, _BLOCK_SIZE):
+        block = slice(start, start + _BLOCK_SIZE)
+        not_converged += _colebrook_white(Re_flat[block], eD_flat[block],
+                                          rel_tol, max_iter,
+                                          lambda_flat[block], iterations_flat[block])
+    implausible = np.count_nonzero(Re <= 0)
+    if implausible:
+        logger.warning("Reynolds number <= 0 for %d elements, this is not plausible",
+                       implausible)
+    # NaN input, e.g. fluid properties outside of their tables, gives NaN
+    logger.debug("Reynolds number is NaN for %d elements",
+                 np.count_nonzero(np.isnan(Re)))
+    if not_converged:
+        logger.warning("Iteration error limit not reached after %d cycles "
+                       "for %d elements", max_iter, not_converged)
+    logger.debug("Colebrook iteration took at most %d cycles",
+                 iterations.max(initial=0))
+    if instrumentation.enabled:
+        instrumentation.count(elements=Re.size,
+                              iterations=int(iterations.sum()),
+                              not_converged=int(not_converged))
+    if scalar_input:
+        friction_lambda = float(friction_lambda)
+        iterations = int(iterations)
+    if return_iterations:
+        return friction_lambda, iterations
+    return friction_lambda
+
+_BLOCK_SIZE = 65536
+
+def _colebrook_white_scalar(Re, eD, rel_tol, max_iter):
+    """Same as _colebrook_white() for a single element using the math
+    module, which avoids the much larger overhead of numpy for scalars.
+
+    Returns friction factor and number of iterations.
+    """
+    if Re <= 0:
+        logger.warning("Reynolds number <= 0, this is not plausible")
+        return math.nan, 0
+    if math.isnan(Re):
+        return math.nan, 0
     # For laminar flow:
     if Re < 2300:
-        return 64 / Re
-    # Turbulent flow - this is the Colebrook and White formula which is valid for flow in smooth
-    # and rough conduits but has limited accuracy between 2300 < Re < 4000
-    inv_lambda_sqrt = inv_lambda_sqrt_next(1e-15, Re, eD)
-    for i in range(1, 1001):
-        previous_value = inv_lambda_sqrt
-        inv_lambda_sqrt = inv_lambda_sqrt_next(inv_lambda_sqrt, Re, eD)
-        if math.isclose(inv_lambda_sqrt, previous_value, rel_tol=rel_tol):
-            rel_error = inv_lambda_sqrt / previous_value - 1.0
-            print(f"Succeeded iteration after {i} cycles! Relative error: {rel_error}")
+        return 64 / Re, 0
+    a = 2.51 / Re
+    e = eD / 3.71
+    A = -2 * math.log10(e + 6 / 1.255 * a)
+    B = -2 * math.log10(e + A * a)
+    C = -2 * math.log10(e + B * a)
+    inv_lambda_sqrt = A - (B - A)**2 / (C - 2*B + A)
+    if not math.isfinite(inv_lambda_sqrt):
+        return math.nan, 0
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        arg = inv_lambda_sqrt * a + e
+        step = (2 * math.log10(arg) + inv_lambda_sqrt) / (
+            1 + 2 / math.log(10) * a / arg)
+        inv_lambda_sqrt -= step
+        step /= inv_lambda_sqrt
+        if step * step <= rel_tol:
             break
-    if i == 1000:
-        rel_error = inv_lambda_sqrt / previous_value - 1.0
-        print(f"Warning: Iteration error limit not reached after {i} cycles! Abs. relative error: {rel_error}")
-    return 1 / inv_lambda_sqrt ** 2
+    else:
+        logger.warning("Iteration error limit not reached after %d cycles",
+                       max_iter)
+    return 1 / inv_lambda_sqrt**2, iterations
+
+def _colebrook_white(Re, eD, rel_tol, max_iter, out_lambda, out_iterations):
+    """Friction factor for 1-D arrays, see pipe_friction_lambda()
+
+    Results are written into out_lambda and out_iterations,
+    returns the number of elements not converged.
+    """
+    with np.errstate(all="ignore"):
+        # Turbulent flow - this is the Colebrook and White formula which is valid for flow in smooth
+        # and rough conduits but has limited accuracy between 2300 < Re < 4000.
+        # All elements are calculated, laminar ones are replaced at the end.
+        a = 2.51 / Re
+        e = eD / 3.71
+        # Serghides explicit approximation as starting value for x = 1/sqrt(lambda)
+        A = -2 * np.log10(e + 6 / 1.255 * a)
+        B = -2 * np.log10(e + A * a)
+        C = -2 * np.log10(e + B * a)
+        inv_lambda_sqrt = A - (B - A)**2 / (C - 2*B + A)
+        out_iterations[...] = 0
+        converged = (Re < 2300) | ~np.isfinite(inv_lambda_sqrt)
+        for _ in range(max_iter):
+            if converged.all():
+                break
+            # Newton step for f(x) = x + 2*log10(2.51*x/Re + eD/3.71) = 0
+            arg = inv_lambda_sqrt * a
+            arg += e
+            step = np.log10(arg)
+            step *= 2
+            step += inv_lambda_sqrt
+            step /= 1 + 2 / math.log(10) * a / arg
+            np.copyto(step, 0.0, where=converged)
+            out_iterations += ~converged
+            inv_lambda_sqrt -= step
+            # Quadratic convergence: the remaining relative error is in the
+            # order of the square of the relative step size
+            step /= inv_lambda_sqrt
+            converged |= step * step <= rel_tol
+        # For laminar flow:
+        out_lambda[...] = np.where(Re < 2300, 64 / Re, 1 / inv_lambda_sqrt**2)
+        out_lambda[~(Re > 0)] = np.nan
+    return np.count_nonzero(~converged)
 
 def pipe_zeta(l_m, Di_mm, friction_lambda):
     """Calculates zeta number from Darcy friction number and pipe dimensions
@@ -84,7 +207,7 @@ def pipe_delta_p_mbar(l_m, Di_mm, Q_l_min, k_mm, rho, viscosity_dyn):
     Re = reynolds(v_f, rho, Di_mm, viscosity_dyn)
     eD = k_mm / Di_mm
     pipe_friction = pipe_friction_lambda(Re, eD)
-    zeta = pipe_zeta(l_m, D_i_mm, pipe_friction)
+    zeta = pipe_zeta(l_m, Di_mm, pipe_friction)
     return 1/100 * zeta * rho/2.0 * v_f**2
 
 def test_pressure_loss():
@@ -124,6 +247,7 @@ def test_pressure_loss():
           )
 
     # Using the Python "fluids" package
+    import fluids
     pipe_friction = fluids.friction.friction_factor(Re, eD)
     zeta = pipe_zeta(l_m, Di_mm, pipe_friction)
     delta_p_mbar = pipe_delta_p_mbar(l_m, Di_mm, Q_l_min, k_mm, rho, viscosity_dyn)
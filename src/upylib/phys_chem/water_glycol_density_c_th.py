@@ -1,5 +1,55 @@
 import numpy as np
 
+from upylib.phys_chem.lookup_table import UniformTable
+
+# Coefficients of the water density polynomial, see rho_water()
+RHO_WATER_NUM = (-2.8103006E-10, 1.0584601E-7, -4.6241757E-5,
+                 -7.9905127E-3,  1.6952577E+1,  9.9983952E+2)
+RHO_WATER_DENOM = (1.6887200E+1, 1000.0)
+
+# Reference data for c_th_water()
+C_TH_WATER_T = np.arange(0.0, 110.0, 10.0)
+C_TH_WATER_REF = np.array((4217.7, 4192.2, 4181.9, 4178.5, 4178.6, 4180.7,
+                           4184.4, 4189.6, 4196.4, 4205.1, 4216.0))
+
+# Reference data for rho_glykol60()
+RHO_GLYKOL60_T = np.arange(-40.0, 120.0, 10.0)
+RHO_GLYKOL60_REF = np.array((
+     1.120010, 1.114359, 1.108554, 1.102760, 1.096879, 1.090945, 1.085007,
+     1.078812, 1.072367, 1.065847, 1.059047, 1.051983, 1.044773, 1.037459,
+     1.030002, 1.022522
+))
+
+# Reference data for c_th_glykol60()
+C_TH_GLYKOL60_T = np.arange(-40.0, 110.0, 5.0)
+C_TH_GLYKOL60_REF = np.array((
+     2703.30, 2749.60, 2793.74, 2838.47, 2879.21, 2919.42, 2955.72, 2992.30,
+     3026.66, 3059.85, 3092.32, 3122.75, 3152.32, 3181.33, 3208.28,
+     3234.92, 3259.96, 3285.54, 3309.36, 3331.49, 3354.35, 3375.35,
+     3396.78, 3415.90, 3435.59, 3454.44, 3471.16, 3487.49, 3503.92, 3517.87
+))
+
+# Reference tables of ethylene glycol and water mixtures by volume percent,
+# for property_table(). Further concentrations can be added here, mixtures
+# in between are interpolated linearly. Water (0%) is built in.
+GLYCOL_TABLES = {
+    60: {
+        "rho": (RHO_GLYKOL60_T, RHO_GLYKOL60_REF),
+        "c_th": (C_TH_GLYKOL60_T, C_TH_GLYKOL60_REF),
+    },
+}
+# Definition range of rho_water()
+RHO_WATER_RANGE = (0.0, 100.0)
+
+
+def horner(coefficients, x):
+    """Evaluates a polynomial with coefficients in decreasing powers,
+    same as np.polyval(), for scalars or arrays"""
+    result = coefficients[0]
+    for c in coefficients[1:]:
+        result = result * x + c
+    return result
+
 def rho_water(theta):
     """5-th order polynomial for the density of water depending on the
     temperature according to the ITS-90 scale.
@@ -10,12 +60,9 @@ def rho_water(theta):
     Temperatur nach Einführung der Internationalen Temperaturskala
     von 1990.", PTB Mitteilungen, 1990, 100(3), pg. 195 - 196
     """
-    water_num = np.poly1d([-2.8103006E-10, 1.0584601E-7, -4.6241757E-5,
-                           -7.9905127E-3,  1.6952577E+1,  9.9983952E+2])
-    water_denom = np.poly1d([1.6887200E+1, 1000.0])
-    return water_num(theta)/water_denom(theta)
+    return horner(RHO_WATER_NUM, theta)/horner(RHO_WATER_DENOM, theta)
+
 
- 
 def c_th_water(theta):
     """Piecewise linear interpolation of the specific heat capacity of
     water for the temperature range between 0°C and 100°C
@@ -37,10 +84,7 @@ def c_th_water(theta):
     Source:
     http://www.wissenschaft-technik-ethik.de/wasser_eigenschaften.html#kap04
     """
-    t_ref = np.array(range(0, 110, 10))
-    c_ref = np.array((4217.7, 4192.2, 4181.9, 4178.5, 4178.6, 4180.7,
-                      4184.4, 4189.6, 4196.4, 4205.1, 4216.0))
-    return np.interp(theta, t_ref, c_ref)
+    return np.interp(theta, C_TH_WATER_T, C_TH_WATER_REF)
 
 
 def rho_glykol60(theta):
@@ -50,15 +94,7 @@ def rho_glykol60(theta):
     Source: graph data,
     BASF "GLYSANTIN Graphs", September 2016, page 3
     """
-    t_ref = np.array((
-        -40, -30, -20, -10, 0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100, 110
-    ))
-    rho_ref = np.array((
-         1.120010, 1.114359, 1.108554, 1.102760, 1.096879, 1.090945, 1.085007,
-         1.078812, 1.072367, 1.065847, 1.059047, 1.051983, 1.044773, 1.037459,
-         1.030002, 1.022522
-    ))
-    return np.interp(theta, t_ref, rho_ref)
+    return np.interp(theta, RHO_GLYKOL60_T, RHO_GLYKOL60_REF)
 
 
 def c_th_glykol60(theta):
@@ -67,16 +103,61 @@ def c_th_glykol60(theta):
     range between -40°C and 105°C
 
     Source: graph data,
-    BASF "GLYSANTIN Graphs", September 2016, page 5 
+    BASF "GLYSANTIN Graphs", September 2016, page 5
+    """
+    return np.interp(theta, C_TH_GLYKOL60_T, C_TH_GLYKOL60_REF)
+
+
+def _base_table(prop, vol_percent, x_step, bounds):
+    if vol_percent == 0:
+        if prop == "rho":
+            return UniformTable.from_function(rho_water, *RHO_WATER_RANGE,
+                                              x_step or 0.1, bounds)
+        return UniformTable.from_points(C_TH_WATER_T, C_TH_WATER_REF,
+                                        x_step, bounds)
+    return UniformTable.from_points(*GLYCOL_TABLES[vol_percent][prop],
+                                    x_step, bounds)
+
+_tables = {}
+
+def property_table(prop, vol_percent=0, x_step=None, bounds="clip"):
+    """Lookup table of a property of water or ethylene glycol and water
+    mixtures depending on temperature in °C
+
+    Parameters:
+        prop: "rho" for density in g/cm³, "c_th" for specific heat
+              capacity in J/kg/K
+        vol_percent: glycol concentration by volume. Concentrations between
+                     the entries of GLYCOL_TABLES (and 0 for water) are
+                     interpolated linearly, within the common temperature
+                     range of both neighbouring tables.
+        x_step: temperature step of the table. Default is the step of the
+                reference data, or 0.1 K for the water density polynomial.
+        bounds: policy for temperatures outside of the table range,
+                see UniformTable
+
+    Tables are built on first use and cached.
+    Returns a UniformTable, which is called with the temperature.
     """
-    t_ref = np.array((
-        -40, -35, -30, -25, -20, -15, -10, -5, 0, 5, 10, 15, 20, 25, 30, 35,
-         40, 45, 50, 55, 60, 65, 70, 75, 80, 85, 90, 95, 100, 105
-    ))
-    c_ref = np.array((
-         2703.30, 2749.60, 2793.74, 2838.47, 2879.21, 2919.42, 2955.72, 2992.30,
-         3026.66, 3059.85, 3092.32, 3122.75, 3152.32, 3181.33, 3208.28,
-         3234.92, 3259.96, 3285.54, 3309.36, 3331.49, 3354.35, 3375.35,
-         3396.78, 3415.90, 3435.59, 3454.44, 3471.16, 3487.49, 3503.92, 3517.87
-    ))
-    return np.interp(theta, t_ref, c_ref)
+    assert prop in ("rho", "c_th"), f"Unknown property: {prop}"
+    key = (prop, vol_percent, x_step, bounds)
+    if key in _tables:
+        return _tables[key]
+    concentrations = sorted({0, *GLYCOL_TABLES})
+    if not concentrations[0] <= vol_percent <= concentrations[-1]:
+        raise ValueError(f"No data for {vol_percent}% glycol, available "
+                         f"range is {concentrations[0]}...{concentrations[-1]}%")
+    if vol_percent in concentrations:
+        table = _base_table(prop, vol_percent, x_step, bounds)
+    else:
+        i = np.searchsorted(concentrations, vol_percent)
+        c_low, c_high = concentrations[i - 1], concentrations[i]
+        low = _base_table(prop, c_low, x_step, bounds)
+        high = _base_table(prop, c_high, x_step, bounds)
+        weight = (vol_percent - c_low) / (c_high - c_low)
+        table = UniformTable.from_function(
+            lambda x: (1 - weight) * low(x) + weight * high(x),
+            max(low.x_start, high.x_start), min(low.x_end, high.x_end),
+            min(low.x_step, high.x_step), bounds)
+    _tables[key] = table
+    return table
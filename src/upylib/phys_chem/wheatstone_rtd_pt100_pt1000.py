@@ -1,5 +1,20 @@
 import numpy as np
 
+from upylib import instrumentation
+from upylib.phys_chem.lookup_table import UniformTable
+
+# ITS-90 Callendar-Van Dusen coefficients for platinum RTDs,
+# see ptRTD_temperature()
+PT_A = 3.9083E-3
+PT_B = -5.775E-7
+PT_C = -4.183E-12
+# Polynomial correction of ptRTD_temperature() for negative temperatures,
+# in powers of r_x/r_0
+PT_CORRECTION = np.array((1.51892983e+00, -2.85842067e+00, -5.34227299e+00,
+                          1.80282972e+01, -1.61875985e+01,  4.84112370e+00))
+# Definition range of the Callendar-Van Dusen equation in °C
+CVD_RANGE = (-200.0, 850.0)
+
 def wheatstone(ud, u0, nref, rs1):
     """ Return wheatstone bridge unknown resistance.
     Arguments:
@@ -22,7 +37,7 @@ def ptRTD_temperature(r_x, r_0=1000.0):
     """Quadratic equation for the temperature of platinum RTDs.
     This is the inversion of the H.L.Callendar polynomial for positive
     temperatures.
-    
+
     Result is temperature in °C according to the ITS-90 scale.
 
     For negative temperatures, we are adding a correction term. This is
@@ -30,26 +45,96 @@ def ptRTD_temperature(r_x, r_0=1000.0):
     inverted ITS-90 standard Callendar-Van Dusen equation, using coef-
     ficient "C" for T < 0, from the second-order equation without
     coefficient "C". Source for the ITS-90 standard polynomial:
-    
+
     http://de-de.wika.de/upload/DS_IN0029_en_co_59667.pdf
     (Verified with DIN EN 60751:2009, 2017-02-21)
 
     Source for the correction term:
     https://github.com/ulikoehler/UliEngineering
+
+    r_x can be a scalar or an array with positive and negative temperatures,
+    the correction is applied element-wise.
     """
-    PT_A =  3.9083E-3
-    PT_B = -5.775E-7
     # Uncorrected solution which is exact for positive temperatures
     r_norm = r_x / r_0
     theta = (- PT_A + np.sqrt(PT_A**2 - 4*PT_B*(1 - r_norm))
             ) / (2*PT_B)
-    if r_norm < 1.0:
-        # Polynomial correction only for negative temperatures
-        correction = np.poly1d(
-            [1.51892983e+00, -2.85842067e+00, -5.34227299e+00,
-             1.80282972e+01, -1.61875985e+01,  4.84112370e+00]
-        )
-        return theta + correction(r_norm)
-    else:
-        return theta
+    # Polynomial correction only for negative temperatures
+    return theta + np.where(r_norm < 1.0, np.polyval(PT_CORRECTION, r_norm),
+                            0.0)
+
+
+def cvd_resistance(theta, r_0=1000.0):
+    """Resistance of platinum RTDs according to the ITS-90 standard
+    Callendar-Van Dusen equation, for theta in °C"""
+    theta = np.asarray(theta, dtype=float)
+    c = np.where(theta < 0, PT_C, 0.0)
+    return r_0 * (1 + theta*(PT_A + theta*(PT_B + c*(theta - 100)*theta)))
 
+@instrumentation.instrumented()
+def cvd_temperature(r_x, r_0=1000.0, n_iter=3):
+    """Exact inversion of the Callendar-Van Dusen equation, see
+    cvd_resistance(). Starts from ptRTD_temperature() and applies n_iter
+    Newton steps, which reaches machine precision for the full range
+    of -200°C...850°C."""
+    r_norm = np.asarray(r_x, dtype=float) / r_0
+    instrumentation.count(elements=r_norm.size, iterations=n_iter)
+    theta = ptRTD_temperature(r_norm, 1.0)
+    for _ in range(n_iter):
+        c = np.where(theta < 0, PT_C, 0.0)
+        f = 1 + theta*(PT_A + theta*(PT_B + c*(theta - 100)*theta)) - r_norm
+        df = PT_A + theta*(2*PT_B + c*(4*theta - 300)*theta)
+        theta = theta - f / df
+    return theta
+
+_cvd_tables = {}
+
+def cvd_table(n_points=16384, bounds="nan"):
+    """Lookup table of the exact inverse Callendar-Van Dusen equation
+    over the normalized resistance r_x/r_0, for -200°C...850°C
+
+    The default table size gives an interpolation error below 1 µK.
+    Tables are built on first use and cached.
+    """
+    key = (n_points, bounds)
+    if key not in _cvd_tables:
+        r_min, r_max = cvd_resistance(CVD_RANGE, 1.0)
+        _cvd_tables[key] = UniformTable.from_function(
+            lambda r_norm: cvd_temperature(r_norm, 1.0), r_min, r_max,
+            (r_max - r_min) / (n_points - 1), bounds)
+    return _cvd_tables[key]
+
+@instrumentation.instrumented()
+def bridge_temperature(ud, u0, nref, rs1, r_0=1000.0, method="fit"):
+    """Platinum RTD temperature in °C from wheatstone bridge voltages,
+    for arrays of bridge voltages, see wheatstone()
+
+    method:
+        "fit":   Quadratic equation with polynomial correction for negative
+                 temperatures, same as ptRTD_temperature()
+        "table": Interpolation in cvd_table(), NaN outside of the range of
+                 the Callendar-Van Dusen equation
+        "exact": Newton inversion of the Callendar-Van Dusen equation,
+                 see cvd_temperature()
+    """
+    # Normalized resistance, computed in place in one buffer
+    r_norm = np.asarray(np.add(ud, u0, dtype=float))
+    r_norm *= rs1 / r_0
+    r_norm /= np.subtract(np.multiply(u0, nref), ud)
+    instrumentation.count(elements=r_norm.size)
+    if method == "table":
+        return cvd_table()(r_norm)
+    if method == "exact":
+        return cvd_temperature(r_norm, 1.0)
+    assert method == "fit", f"Unknown method: {method}"
+    negative = r_norm < 1.0
+    r_negative = r_norm[negative]
+    theta = r_norm
+    theta *= 4*PT_B
+    theta += PT_A**2 - 4*PT_B
+    np.sqrt(theta, out=theta)
+    theta -= PT_A
+    theta /= 2*PT_B
+    theta[negative] += np.polyval(PT_CORRECTION, r_negative)
+    # Scalar for scalar input
+    return theta[()]
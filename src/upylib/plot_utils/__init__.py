@@ -0,0 +1,11 @@
+"""Plotting utilities based on matplotlib"""
+from upylib import lazy_loader
+
+__getattr__, __dir__ = lazy_loader(
+    __name__,
+    ("multi_axes",),
+    {
+        "plot_3_axes": "multi_axes",
+        "plot_decimated": "multi_axes",
+        "LivePlot3Axes": "multi_axes",
+    })
@@ -1,11 +1,20 @@
-from matplotlib.figure import Figure
-from matplotlib.pyplot import figure as pyplot_fig
-from matplotlib.ticker import EngFormatter, AutoMinorLocator
-from mpl_toolkits.axisartist.parasite_axes import HostAxes, ParasiteAxes
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from upylib.devices.waveform_processing import minmax_decimate
+
+# matplotlib is only imported on first use
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+    from matplotlib.lines import Line2D
+    from mpl_toolkits.axisartist.parasite_axes import HostAxes, ParasiteAxes
 
 def set_ax_format(ax):
     """Set axis number labels to engineering format and set tick locations
     """
+    from matplotlib.ticker import EngFormatter, AutoMinorLocator
     # Define axis labels format
     format_eng = EngFormatter(places=1, unit=" ", sep="\N{THIN SPACE}")
     # ticks_log_E6 = ticker.LogLocator(subs=(1.0, 1.5, 2.2, 3.3, 4.7, 6.8))
@@ -25,6 +34,8 @@ def plot_3_axes(
     First Y-axis is located on the left side of the plot,
     second and third Y-axes are placed on the right hand side.
     """
+    from matplotlib.pyplot import figure as pyplot_fig
+    from mpl_toolkits.axisartist.parasite_axes import HostAxes
     if figure is None:
         figure = pyplot_fig()
     host_ax = figure.add_subplot(axes_class=HostAxes)
@@ -50,3 +61,153 @@ def plot_3_axes(
     figure.subplots_adjust(left=0.09, right=0.84)
 
     return figure, host_ax, par_ax1, par_ax2
+
+def plot_decimated(ax, decimate, **line_kwargs) -> Line2D:
+    """Plot a long waveform as min/max envelope of the visible X-range
+
+    decimate is a callable (x_start, x_end, n_buckets) -> (x, y) returning
+    about 2 * n_buckets points, with x_start and x_end = None selecting the
+    initial range, e.g. for RTH1004_DATA channel 4:
+        plot_decimated(ax, lambda x0, x1, n: scope.decimate(4, n, x0, x1))
+
+    Whenever the X-axis limits change, the line data is recalculated with
+    one bucket per horizontal pixel of the axes. Rendering cost is then
+    independent of the record length and narrow spikes remain visible.
+    """
+    def n_buckets():
+        return max(int(ax.get_window_extent().width), 1)
+
+    def update(_ax):
+        x_start, x_end = ax.get_xlim()
+        line.set_data(*decimate(x_start, x_end, n_buckets()))
+
+    line, = ax.plot(*decimate(None, None, n_buckets()), **line_kwargs)
+    # Parasite and twin axes share the X-axis but only the axes on which
+    # the limits were set emits the callback
+    for sibling in ax.get_shared_x_axes().get_siblings(ax):
+        sibling.callbacks.connect("xlim_changed", update)
+    return line
+
+
+class LivePlot3Axes():
+    """Live-updating plot of three data streams on the plot_3_axes() layout
+
+    Samples are appended into a ring buffer holding the last window_length
+    values. update() redraws only the three lines onto a cached background
+    image (blitting). Axes, ticks and labels are only redrawn after the
+    figure was resized or when the autoscaled limits actually change: the
+    X-axis advances in steps of x_step times the visible time span, the
+    Y-axes expand when data leaves the current limits and shrink when the
+    data plus a margin of 10% of its range on both sides occupies less
+    than y_shrink of the axis range.
+
+    Windows with more samples than the plot is wide in pixels are drawn
+    as min/max envelope, so that the frame rate does not depend on
+    window_length.
+
+    Usage:
+        live = LivePlot3Axes(300_000)
+        live.host_ax.set_ylabel("Temperature / °C")
+        while True:
+            live.append(t, temperature, flow, delta_p)
+            live.update()
+    """
+    def __init__(self,
+                 window_length: int,
+                 ax1_color: str = "red",
+                 ax2_color: str = "green",
+                 ax3_color: str = "blue",
+                 figure = None,
+                 x_step: float = 0.25,
+                 y_shrink: float = 0.5):
+        self.figure, self.host_ax, self.par_ax1, self.par_ax2 = plot_3_axes(
+            ax1_color, ax2_color, ax3_color, figure
+        )
+        self.axes = (self.host_ax, self.par_ax1, self.par_ax2)
+        self.window_length = window_length
+        self.x_step = x_step
+        self.y_shrink = y_shrink
+        # Every sample is stored twice, at index i and i + window_length,
+        # so that the window is always a contiguous slice of the buffer.
+        self._t = np.empty(2 * window_length)
+        self._y = np.empty((3, 2 * window_length))
+        self._pos = 0
+        self._count = 0
+        self.lines = [ax.plot([], [], color=color, animated=True)[0]
+                      for ax, color in zip(self.axes,
+                                           (ax1_color, ax2_color, ax3_color))]
+        self._background = None
+        self._background_bounds = None
+        self.figure.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def append(self, t, y1, y2, y3):
+        """Append one or more samples (scalars or equal-length arrays)"""
+        t = np.atleast_1d(t)
+        y = np.empty((3, len(t)))
+        y[0], y[1], y[2] = y1, y2, y3
+        t = t[-self.window_length:]
+        y = y[:, -self.window_length:]
+        idx = (self._pos + np.arange(len(t))) % self.window_length
+        for offset in (0, self.window_length):
+            self._t[idx + offset] = t
+            self._y[:, idx + offset] = y
+        self._pos = (self._pos + len(t)) % self.window_length
+        self._count = min(self._count + len(t), self.window_length)
+
+    @property
+    def window(self) -> tuple[np.ndarray, np.ndarray]:
+        """Time and (3, n) value arrays of the buffered window, oldest first"""
+        if self._count < self.window_length:
+            return self._t[:self._count], self._y[:, :self._count]
+        end = self._pos + self.window_length
+        return self._t[self._pos:end], self._y[:, self._pos:end]
+
+    def update(self):
+        """Draw the current window, redrawing the axes only if required"""
+        t, y = self.window
+        if len(t) == 0:
+            return
+        n_buckets = max(int(self.host_ax.get_window_extent().width), 1)
+        for line, values in zip(self.lines, y):
+            idx, values = minmax_decimate(values, [], 0, len(t), n_buckets)
+            line.set_data(t[idx], values)
+        # Not every backend draws the figure after a resize
+        if (self._autoscale(t, y) or self._background is None
+                or self._background_bounds != self.figure.bbox.bounds):
+            # Full redraw, the background is captured in _on_draw()
+            self.figure.canvas.draw()
+        else:
+            self.figure.canvas.restore_region(self._background)
+            self._draw_lines()
+        self.figure.canvas.flush_events()
+
+    def _autoscale(self, t: np.ndarray, y: np.ndarray) -> bool:
+        """Update axes limits if necessary, returns True if changed"""
+        changed = False
+        x_start, x_end = self.host_ax.get_xlim()
+        if t[-1] > x_end or t[0] < x_start:
+            span = max(t[-1] - t[0], np.finfo(float).eps)
+            self.host_ax.set_xlim(t[0], t[-1] + self.x_step * span)
+            changed = True
+        for ax, values in zip(self.axes, y):
+            y_min, y_max = np.nanmin(values), np.nanmax(values)
+            margin = 0.1 * (y_max - y_min) or 1.0
+            lim_min, lim_max = ax.get_ylim()
+            # The range after shrinking includes the margin, constant data
+            # then does not trigger a redraw on every update
+            if (y_min < lim_min or y_max > lim_max
+                    or y_max - y_min + 2 * margin
+                    < self.y_shrink * (lim_max - lim_min)):
+                ax.set_ylim(y_min - margin, y_max + margin)
+                changed = True
+        return changed
+
+    def _on_draw(self, _event):
+        self._background = self.figure.canvas.copy_from_bbox(self.figure.bbox)
+        self._background_bounds = self.figure.bbox.bounds
+        self._draw_lines()
+
+    def _draw_lines(self):
+        for ax, line in zip(self.axes, self.lines):
+            ax.draw_artist(line)
+        self.figure.canvas.blit(self.figure.bbox)
@@ -0,0 +1,9 @@
+"""Sensor characteristics and look-up-table generation"""
+from upylib import lazy_loader
+
+__getattr__, __dir__ = lazy_loader(
+    __name__,
+    ("kty81_1xx_sensor_generate_lut",),
+    {
+        "build_lut": "kty81_1xx_sensor_generate_lut",
+    })
@@ -24,10 +24,15 @@ different nominal values.
 +++            |100nF    |
  |             |         |
  +-------------+---------+
+
+Tables are generated on demand by build_lut() and memoized per parameter
+set. The results of the original script for the default circuit are still
+available as module attributes lut_temps_kty81_110_120, lut_temps_kty81_121,
+f_interp_kty81_110_120 and f_interp_kty81_121, calculated on first access.
 """
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.interpolate import interp1d
+
+from upylib.phys_chem.lookup_table import UniformTable
 
 
 #################### Circuit configuration
@@ -40,32 +45,217 @@ temps_datasheet = [-55, -50, -40, -30, -20,
                    80, 90, 100, 110, 120,
                    125, 130, 140, 150]
 
-
-###################### Calculation for KTY81_110 and KTY81_120
-# Nominal resistance values in ohms
+# Nominal resistance values in ohms for KTY81_110 and KTY81_120
 r_x_kty81_110_120 = [490, 515, 567, 624, 684,
                      747, 815, 886, 961, 1000,
                      1040, 1122, 1209, 1299, 1392,
                      1490, 1591, 1696, 1805, 1915,
                      1970, 2023, 2124, 2211]
-v_x = [vdd_circuit_millivolts * r_x / (r_circuit_pullup_ohms + r_x)
-       for r_x in r_x_kty81_110_120]
-f_interp_kty81_110_120 = interp1d(v_x, temps_datasheet, "cubic")
-v_x_lin = np.linspace(v_x[0], v_x[-1], num=32)
-################### RESULT: temperature look-up table for 31 equal voltage steps
-lut_temps_kty81_110_120 = f_interp_kty81_110_120(v_x_lin)
-
-
-####################### Calculation for KTY81_121
-# Nominal resistance values in ohms
+# Nominal resistance values in ohms for KTY81_121
 r_x_kty81_121 = [485, 510, 562, 617, 677,
                  740, 807, 877, 951, 990,
                  1029, 1111, 1196, 1286, 1378,
                  1475, 1575, 1679, 1786, 1896,
                  1950, 2003, 2103, 2189]
-v_x = [vdd_circuit_millivolts * r_x / (r_circuit_pullup_ohms + r_x)
-       for r_x in r_x_kty81_121]
-f_interp_kty81_121 = interp1d(v_x, temps_datasheet, "cubic")
-v_x_lin = np.linspace(v_x[0], v_x[-1], num=32)
-################### RESULT: temperature look-up table for 31 equal voltage steps
-lut_temps_kty81_121 = f_interp_kty81_121(v_x_lin)
\ No newline at end of file
+
+# Resistance curves as (temperatures in °C, resistances in ohms)
+SENSOR_CURVES = {
+    "KTY81-110": (temps_datasheet, r_x_kty81_110_120),
+    "KTY81-120": (temps_datasheet, r_x_kty81_110_120),
+    "KTY81-121": (temps_datasheet, r_x_kty81_121),
+}
+
+
+class SensorLUT():
+    """Temperature look-up-table over equidistant ADC input steps
+
+    Attributes:
+        x_start, x_step: ADC code (or voltage in mV if adc_bits is None)
+                         of the first table entry and step between entries
+        temps:           Table of temperatures in °C as floats
+        table:           Table as stored in firmware: temps for float
+                         tables, otherwise integers of temps * 2**frac_bits
+        max_error:       Largest deviation in K of the linear interpolation
+                         in the table from the cubic reference curve, for
+                         all ADC codes (or a dense voltage grid) in range,
+                         including the fixed-point rounding error
+    """
+    def __init__(self, name, x_start, x_step, temps, frac_bits, reference,
+                 x_reference):
+        self.name = name
+        self.x_start = x_start
+        self.x_step = x_step
+        self.temps = temps
+        self.frac_bits = frac_bits
+        if frac_bits is None:
+            self.table = temps
+        else:
+            self.table = np.round(temps * 2**frac_bits).astype(np.int32)
+        self._interp = UniformTable(x_start, x_step, self.table / (
+            1 if frac_bits is None else 2**frac_bits))
+        self.max_error = float(np.abs(
+            self(x_reference) - reference(x_reference)).max())
+
+    def __call__(self, x):
+        """Temperature in °C for ADC code (or voltage in mV) x, using linear
+        interpolation as the firmware does. Values outside of the table
+        range are clipped. For fixed-point tables over ADC codes, the
+        integer arithmetic of c_code() is reproduced exactly."""
+        if self.frac_bits is None or not isinstance(self.x_step, int):
+            return self._interp(x)
+        n = len(self.table)
+        offset = np.clip(np.asarray(x, dtype=np.int64) - self.x_start,
+                         0, self.x_step * (n - 1))
+        i = np.minimum(offset // self.x_step, n - 2)
+        delta = (self.table[i + 1] - self.table[i]) * (offset - i*self.x_step)
+        # C integer division truncates towards zero
+        value = self.table[i] + np.sign(delta) * (np.abs(delta) // self.x_step)
+        return value / 2**self.frac_bits
+
+    def c_code(self):
+        """Returns C source code for the table and an interpolation function
+        taking an ADC code as uint32_t (or a voltage in mV as float, for
+        tables over voltages) and returning the temperature in °C (float
+        tables) or in 1/2**frac_bits °C (fixed-point tables). Arguments
+        outside of the table range are clipped."""
+        def c_float(x):
+            # repr() always has a decimal point or exponent, as C requires
+            return repr(float(x)) + "f"
+        prefix = "".join(c if c.isalnum() else "_" for c in self.name).lower()
+        n = len(self.table)
+        if self.frac_bits is None:
+            c_type = "float"
+            entries = [c_float(x) for x in self.table]
+            result_type = "float"
+        else:
+            c_type = "int16_t" if np.abs(self.table).max() < 2**15 else "int32_t"
+            entries = [str(x) for x in self.table]
+            result_type = "int32_t"
+        lines = [f"/* {self.name}, max. interpolation error {self.max_error:.3g} K"
+                 + ("" if self.frac_bits is None else
+                    f", fixed-point with {self.frac_bits} fractional bits")
+                 + " */",
+                 f"static const {c_type} {prefix}_lut[{n}] = {{"]
+        for i in range(0, n, 8):
+            lines.append("    " + ", ".join(entries[i:i+8]) + ",")
+        lines.append("};")
+        if isinstance(self.x_step, int):
+            lines += [
+                f"static inline {result_type} {prefix}_temperature(uint32_t code)",
+                "{",
+                f"    if (code <= {self.x_start}u) return {prefix}_lut[0];",
+                f"    code -= {self.x_start}u;",
+                f"    uint32_t i = code / {self.x_step}u;",
+                f"    if (i >= {n - 1}u) return {prefix}_lut[{n - 1}];",
+                f"    int32_t frac = (int32_t)(code - i * {self.x_step}u);",
+            ]
+            if self.frac_bits is None:
+                lines.append(f"    return {prefix}_lut[i] + ({prefix}_lut[i + 1]"
+                             f" - {prefix}_lut[i]) * frac / {self.x_step}.0f;")
+            else:
+                lines.append(f"    return {prefix}_lut[i] + ({prefix}_lut[i + 1]"
+                             f" - {prefix}_lut[i]) * frac / {self.x_step};")
+            lines.append("}")
+        else:
+            lines += [
+                f"static inline {result_type} {prefix}_temperature(float millivolts)",
+                "{",
+                f"    float pos = (millivolts - {c_float(self.x_start)})"
+                f" / {c_float(self.x_step)};",
+                f"    if (!(pos > 0.0f)) return {prefix}_lut[0];",
+                f"    if (pos >= {n - 1}.0f) return {prefix}_lut[{n - 1}];",
+                "    uint32_t i = (uint32_t)pos;",
+                "    float frac = pos - (float)i;",
+            ]
+            if self.frac_bits is None:
+                lines.append(f"    return {prefix}_lut[i] + ({prefix}_lut[i + 1]"
+                             f" - {prefix}_lut[i]) * frac;")
+            else:
+                lines.append(f"    return {prefix}_lut[i] + (int32_t)(({prefix}_lut"
+                             f"[i + 1] - {prefix}_lut[i]) * frac);")
+            lines.append("}")
+        return "\n".join(lines) + "\n"
+
+
+def reference_curve(sensor, r_pullup_ohms, vdd_millivolts):
+    """Cubic interpolation of temperature over ADC input voltage in mV,
+    for the sensor resistance curve of the circuit above.
+
+    sensor is a name from SENSOR_CURVES or a tuple of
+    (temperatures in °C, resistances in ohms).
+    """
+    from scipy.interpolate import interp1d
+    temps, r_x = SENSOR_CURVES[sensor] if isinstance(sensor, str) else sensor
+    r_x = np.asarray(r_x, dtype=float)
+    v_x = vdd_millivolts * r_x / (r_pullup_ohms + r_x)
+    return interp1d(v_x, temps, "cubic")
+
+
+_luts = {}
+
+def build_lut(sensor="KTY81-110",
+              r_pullup_ohms=r_circuit_pullup_ohms,
+              vdd_millivolts=vdd_circuit_millivolts,
+              adc_bits=12,
+              table_size=32,
+              frac_bits=None):
+    """Look-up-table of temperatures for equidistant ADC input steps
+
+    Parameters:
+        sensor: name from SENSOR_CURVES or a tuple of
+                (temperatures in °C, resistances in ohms)
+        r_pullup_ohms: pull-up resistor
+        vdd_millivolts: VDD and ADC reference voltage (ratiometric)
+        adc_bits: ADC resolution. The table starts at the first ADC code
+                  inside the sensor curve range, with an integer step of
+                  ADC codes. For None, the table covers the voltage range
+                  of the sensor curve in equal steps, in mV.
+        table_size: number of table entries
+        frac_bits: None for a float table, otherwise number of fractional
+                   bits of a fixed-point integer table
+
+    Tables are memoized per parameter set.
+    Returns a SensorLUT.
+    """
+    if not isinstance(sensor, str):
+        sensor = tuple(tuple(values) for values in sensor)
+    key = (sensor, r_pullup_ohms, vdd_millivolts, adc_bits, table_size,
+           frac_bits)
+    if key in _luts:
+        return _luts[key]
+    name = sensor if isinstance(sensor, str) else "sensor"
+    reference = reference_curve(sensor, r_pullup_ohms, vdd_millivolts)
+    v_min, v_max = reference.x[0], reference.x[-1]
+    if adc_bits is None:
+        x = np.linspace(v_min, v_max, num=table_size)
+        x_start, x_step = x[0], (v_max - v_min) / (table_size - 1)
+        x_reference = np.linspace(v_min, v_max, num=100 * table_size)
+        temps = reference(x)
+        lut = SensorLUT(name, x_start, x_step, temps, frac_bits, reference,
+                        x_reference)
+    else:
+        mv_per_code = vdd_millivolts / 2**adc_bits
+        code_start = int(np.ceil(v_min / mv_per_code))
+        code_end = int(np.floor(v_max / mv_per_code))
+        code_step = (code_end - code_start) // (table_size - 1)
+        assert code_step > 0, "ADC resolution too low for this table size"
+        codes = code_start + code_step * np.arange(table_size)
+        x_reference = np.arange(code_start, codes[-1] + 1)
+        lut = SensorLUT(name, code_start, code_step,
+                        reference(codes * mv_per_code), frac_bits,
+                        lambda code: reference(code * mv_per_code),
+                        x_reference)
+    _luts[key] = lut
+    return lut
+
+
+def __getattr__(name):
+    # Results of the original script, calculated on first access
+    if name.startswith("lut_temps_kty81_"):
+        sensor = "KTY81-121" if name.endswith("121") else "KTY81-110"
+        return build_lut(sensor, adc_bits=None).temps
+    if name.startswith("f_interp_kty81_"):
+        sensor = "KTY81-121" if name.endswith("121") else "KTY81-110"
+        return reference_curve(sensor, r_circuit_pullup_ohms,
+                               vdd_circuit_millivolts)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,62 @@
+"""RTH1004 CSV savefiles for the tests
+
+The header and the first two sample rows are those of a real capture,
+see the end of upylib/devices/rth1004.py. The following rows are random
+but in the number format of the scope: 6 significant digits of values on
+a grid of 1/255 vertical division.
+
+2026-10 Ulrich Lukas
+"""
+import numpy as np
+import pytest
+
+RTH1004_HEADER = """\
+Model;RTH1004
+SerialNumber;103752
+Firmware Version;'1.80.3.4'
+
+Acquisition Time Stamp;2023-01-23 12:08:02.423888073;2023-01-23 12:08:02.423888073;2023-01-23 12:08:02.423888073;2023-01-23 12:08:02.423888073
+Waveform Type;ANALOG;;;
+Acquisition Mode;PEAK;;;
+Horizontal Unit;s;;;
+Horizontal Scale;5e-07;;;
+Horizontal Position;-2.504e-07;;;
+Reference Point;50 %;;;
+Sample Interval;8e-10;;;
+Record Length;{record_length};;;
+Probe Setting;'100:1';'100:1';'10:1';'0.1 V/A'
+Vertical Unit;V;V;V;A
+Vertical Scale;5;5;200;5
+Vertical Position;-1;-1;-1;1
+Vertical Offset;0;0;0;0
+History Index;0;0;0;0
+History Time Stamp;0.000000000000;0.000000000000;0.000000000000;0.000000000000
+;;;;
+TIME;CH1;CH2;CH3;CH4
+-2.7504e-06;16.9216;0.529412;5.4902;0.411765
+-2.7496e-06;16.7647;0.45098;5.4902;0.411765
+"""
+VERTICAL_SCALES = np.array([5.0, 5.0, 200.0, 5.0])
+VERTICAL_POSITIONS = np.array([-1.0, -1.0, -1.0, 1.0])
+CODES_PER_DIV = 255
+
+
+def write_capture(filename: str, record_length: int = 5000, seed: int = 0):
+    """Writes an RTH1004 CSV savefile with square wave samples plus noise"""
+    rng = np.random.default_rng(seed)
+    index = np.arange(2, record_length)
+    square = np.where(index % 1000 < 500, 600, -200)
+    codes = square[:, None] + rng.integers(-20, 21, (len(index), 4))
+    values = (codes / CODES_PER_DIV - VERTICAL_POSITIONS) * VERTICAL_SCALES
+    time = -2.7504e-06 + index * 8e-10
+    with open(filename, "wt") as f:
+        f.write(RTH1004_HEADER.format(record_length=record_length))
+        np.savetxt(f, np.column_stack([time, values]), fmt="%.6g",
+                   delimiter=";")
+
+
+@pytest.fixture
+def capture_csv(tmp_path):
+    filename = str(tmp_path / "capture.csv")
+    write_capture(filename)
+    return filename
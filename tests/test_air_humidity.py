@@ -0,0 +1,75 @@
+import warnings
+import numpy as np
+import pytest
+
+from upylib.phys_chem import air_humidity as ah
+
+RH = np.array([0.0, 0.5, 10.0, 35.0, 60.0, 99.0, 100.0])
+T = np.array([-45.0, -20.0, -0.5, 0.0, 15.0, 37.5, 60.0])
+P = np.array([500.0, 1013.0, 1100.0])
+
+
+def grid():
+    """Corner values plus a random grid over the definition range"""
+    rng = np.random.default_rng(0)
+    rh, t, p = (np.concatenate((corner.ravel(), random)) for corner, random in
+                zip(np.meshgrid(RH, T, P, indexing="ij"),
+                    (rng.uniform(0, 100, 2000), rng.uniform(-45, 60, 2000),
+                     rng.uniform(300, 1100, 2000))))
+    return rh, t, p
+
+
+@pytest.mark.parametrize("name, args", [
+    ("water_p_sat", "t"), ("air_p_w", "rh t"), ("air_dew_point", "rh t"),
+    ("air_abs_hum_vol", "rh t"), ("air_x_w", "rh t p")])
+def test_array_same_as_scalar(name, args):
+    rh, t, p = grid()
+    values = {"rh": rh, "t": t, "p": p}
+    args = [values[arg] for arg in args.split()]
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        result = getattr(ah, name + "_array")(*args)
+    expected = np.empty_like(result)
+    for i in range(len(rh)):
+        scalar_args = [float(arg[i]) for arg in args]
+        if name in ("air_dew_point", "air_x_w") and rh[i] == 0:
+            # Scalar versions divide by zero or take the logarithm of 0
+            expected[i] = np.nan if name == "air_dew_point" else 0.0
+        else:
+            expected[i] = getattr(ah, name)(*scalar_args)
+    # Bit for bit
+    np.testing.assert_array_equal(result, expected)
+
+
+def test_air_properties_match_array_functions():
+    rh, t, p = grid()
+    properties = ah.air_properties(rh, t, p)
+    assert properties["valid"].all()
+    np.testing.assert_array_equal(properties["p_w"], ah.air_p_w_array(rh, t))
+    np.testing.assert_array_equal(properties["dew_point"],
+                                  ah.air_dew_point_array(rh, t))
+    np.testing.assert_array_equal(properties["abs_hum_vol"],
+                                  ah.air_abs_hum_vol_array(rh, t))
+    np.testing.assert_array_equal(properties["x_w"],
+                                  ah.air_x_w_array(rh, t, p))
+
+
+def test_dry_air():
+    assert ah.air_p_w(0, 20.0) == 0.0
+    assert ah.air_p_w_array(np.array([0.0]), 20.0)[0] == 0.0
+    assert ah.air_properties(0.0, 20.0)["abs_hum_vol"] == 0.0
+    assert ah.air_x_w_array(np.array([0.0]), 20.0)[0] == 0.0
+
+
+def test_outside_definition_range_is_nan():
+    rh = np.array([-1.0, 101.0, 50.0, 50.0, 50.0])
+    t = np.array([20.0, 20.0, -46.0, 61.0, 20.0])
+    p = np.array([1013.0, 1013.0, 1013.0, 1013.0, 0.0])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        properties = ah.air_properties(rh, t, p)
+    assert not properties["valid"].any()
+    for name in ("p_sat", "p_w", "dew_point", "abs_hum_vol", "x_w"):
+        assert np.isnan(properties[name]).all(), name
+    with pytest.raises(AssertionError):
+        ah.water_p_sat(61.0)
@@ -0,0 +1,66 @@
+import os
+import numpy as np
+import pytest
+
+from upylib.devices.capture_archive import (
+    CaptureArchive, CSV_PRECISION, detect_codes_per_div, write_archive)
+from upylib.devices.rth1004 import RTH1004_DATA
+from conftest import CODES_PER_DIV, write_capture
+
+
+def test_detect_codes_per_div(capture_csv):
+    capture = RTH1004_DATA(capture_csv)
+    divisions = (capture.ch1 / capture.vertical_scales[0]
+                 + capture.vertical_positions[0])
+    assert detect_codes_per_div(divisions) == CODES_PER_DIV
+    # CH1 of the first two rows of the real capture, codes 608 and 600
+    assert detect_codes_per_div(divisions[:2]) == pytest.approx(
+        CODES_PER_DIV / 8, rel=1e-5)
+    assert detect_codes_per_div(np.ones(10)) is None
+
+
+@pytest.mark.parametrize("codec", ["zlib", "lzma", "none"])
+def test_round_trip(tmp_path, codec):
+    csv_file = str(tmp_path / "capture.csv")
+    write_capture(csv_file, record_length=100_000)
+    capture = RTH1004_DATA(csv_file)
+    archive_file = str(tmp_path / "capture.rtha")
+    result = write_archive(capture, archive_file, chunk_size=10_000,
+                           codec=codec)
+    assert result["encodings"] == ["int16"] * 4
+    assert result["codes_per_div"] == [CODES_PER_DIV] * 4
+    if codec != "none":
+        assert result["ratio"] < 0.2
+        assert os.path.getsize(archive_file) < 0.15 * os.path.getsize(csv_file)
+    archive = CaptureArchive(archive_file)
+    restored = archive.capture()
+    for name in RTH1004_DATA.header_attributes:
+        assert getattr(restored, name) == getattr(capture, name), name
+    np.testing.assert_allclose(restored.time, capture.time, rtol=0,
+                               atol=1e-3 * capture.sample_interval)
+    np.testing.assert_allclose(restored.chs, capture.chs, rtol=CSV_PRECISION,
+                               atol=1e-12)
+    t_start, t_end = capture.time[25_000], capture.time[45_123]
+    time, samples = archive.read_window(t_start, t_end, channels=(4, 2))
+    capture.set_viewport(t_start, t_end)
+    np.testing.assert_allclose(time, capture.time_zoomed, rtol=1e-12)
+    np.testing.assert_allclose(samples, capture.chs_zoomed[[3, 1]],
+                               rtol=CSV_PRECISION, atol=1e-12)
+
+
+def test_float64_and_lossy_encodings(tmp_path, capture_csv):
+    capture = RTH1004_DATA(capture_csv)
+    archive_file = str(tmp_path / "capture.rtha")
+    result = write_archive(capture, archive_file, encoding="float64")
+    assert result["encodings"] == ["float64"] * 4
+    np.testing.assert_array_equal(CaptureArchive(archive_file).read(),
+                                  capture.chs)
+    # The codes of the capture exceed int8, the grid is coarsened to fit
+    result = write_archive(capture, archive_file, encoding="int8")
+    assert result["encodings"] == ["int8"] * 4
+    assert all(n < CODES_PER_DIV for n in result["codes_per_div"])
+    samples = CaptureArchive(archive_file).read()
+    quantization = (np.array(capture.vertical_scales)
+                    / np.array(result["codes_per_div"]))
+    assert np.all(np.abs(samples - capture.chs).max(axis=1)
+                  <= 0.5 * quantization * (1 + 1e-9))
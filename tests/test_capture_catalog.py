@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from upylib.devices.capture_catalog import CaptureCatalog
+from upylib.devices.rth1004 import RTH1004_DATA
+from conftest import write_capture
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    with CaptureCatalog(str(tmp_path / "captures.sqlite")) as catalog:
+        yield catalog
+
+
+def test_scan_with_summaries(tmp_path, catalog):
+    data = tmp_path / "data"
+    data.mkdir()
+    write_capture(str(data / "a.csv"), record_length=3000, seed=0)
+    write_capture(str(data / "b.csv"), record_length=4000, seed=1)
+    (data / "notes.csv").write_text("not a savefile\n")
+    counts = catalog.scan(str(data), summaries=True)
+    assert counts == {"added": 2, "updated": 0, "removed": 0,
+                      "unchanged": 0, "skipped": 1}
+    row, = catalog.find(record_length=(3500, 5000))
+    capture = RTH1004_DATA(row["filename"])
+    assert row["vertical_scale_ch3"] == 200
+    assert row["max_ch2"] == capture.ch2.max()
+    assert row["rms_ch4"] == pytest.approx(np.sqrt(np.mean(capture.ch4**2)))
+    assert catalog.scan(str(data), summaries=True)["unchanged"] == 2
+
+
+def test_truncated_file_is_skipped(tmp_path, catalog):
+    data = tmp_path / "data"
+    data.mkdir()
+    filename = str(data / "truncated.csv")
+    write_capture(filename, record_length=3000)
+    catalog.scan(str(data))
+    assert len(catalog) == 1
+    # Only the header is checked without summaries
+    with open(filename, "rt") as f:
+        lines = f.readlines()
+    with open(filename, "wt") as f:
+        f.writelines(lines[:-100])
+    assert catalog.scan(str(data))["updated"] == 1
+    counts = catalog.scan(str(data), summaries=True)
+    assert counts["skipped"] == 1
+    assert len(catalog) == 0
+    assert catalog.failed_files() == [filename]
+
+
+def test_failed_files_are_not_parsed_again(tmp_path, catalog, caplog):
+    data = tmp_path / "data"
+    data.mkdir()
+    write_capture(str(data / "good.csv"), record_length=3000)
+    bad = data / "bad.csv"
+    bad.write_text("not a savefile\n")
+    assert catalog.scan(str(data))["skipped"] == 1
+    assert catalog.failed_files() == [str(bad)]
+    caplog.clear()
+    counts = catalog.scan(str(data))
+    assert counts == {"added": 0, "updated": 0, "removed": 0,
+                      "unchanged": 1, "skipped": 1}
+    assert not caplog.records
+    # Fixed files are parsed again
+    write_capture(str(bad), record_length=2000)
+    assert catalog.scan(str(data))["added"] == 1
+    assert catalog.failed_files() == []
+    # Failed entries of deleted files are removed
+    (data / "other.csv").write_text("garbage\n")
+    catalog.scan(str(data))
+    (data / "other.csv").unlink()
+    catalog.scan(str(data))
+    assert catalog.failed_files() == []
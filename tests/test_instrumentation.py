@@ -0,0 +1,50 @@
+import tracemalloc
+import numpy as np
+import pytest
+
+from upylib import instrumentation
+from upylib.devices.rth1004 import RTH1004_DATA
+
+
+@pytest.fixture(autouse=True)
+def clean_records():
+    instrumentation.clear()
+    yield
+    instrumentation.disable()
+    instrumentation.clear()
+
+
+@pytest.mark.parametrize("enabled", [False, True])
+def test_list_input(capture_csv, enabled):
+    capture = RTH1004_DATA(capture_csv)
+    samples = [1.0, 2.0, 4.0, 3.0, 5.0]
+    if enabled:
+        instrumentation.enable()
+    np.testing.assert_allclose(capture.filter_average(samples, 3),
+                               capture.filter_average(np.array(samples), 3))
+    np.testing.assert_allclose(capture.do_time_derivative(samples, 3),
+                               capture.do_time_derivative(np.array(samples), 3))
+    summary = instrumentation.summary()
+    if enabled:
+        # Also called by do_time_derivative()
+        assert summary["RTH1004_DATA.filter_average"]["bytes"] == 4 * 40
+        assert summary["RTH1004_DATA.do_time_derivative"]["bytes"] == 2 * 40
+    else:
+        assert summary == {}
+
+
+def test_tracemalloc_started_by_caller_is_kept():
+    tracemalloc.start()
+    try:
+        with instrumentation.recording(memory=True):
+            np.ones(1000)
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_tracemalloc_started_by_enable_is_stopped():
+    assert not tracemalloc.is_tracing()
+    with instrumentation.recording(memory=True):
+        assert tracemalloc.is_tracing()
+    assert not tracemalloc.is_tracing()
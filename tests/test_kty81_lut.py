@@ -0,0 +1,86 @@
+import re
+import shutil
+import subprocess
+import numpy as np
+import pytest
+
+from upylib.sensors.kty81_1xx_sensor_generate_lut import SensorLUT, build_lut
+
+# Float literals with a decimal point or exponent and the f suffix
+C_FLOAT = re.compile(r"-?(\d+\.\d*(e[+-]?\d+)?|\d+e[+-]?\d+)f")
+
+
+def integral_lut():
+    temps = np.array([-50.0, 0.0, 100.0, 150.5])
+    codes = 16 * np.arange(len(temps))
+    return SensorLUT("integral", 0, 16, temps, None,
+                     lambda x: np.interp(x, codes, temps), np.arange(49))
+
+
+def table_entries(c_code):
+    table = c_code.split("{", 1)[1].split("}", 1)[0]
+    return [entry.strip() for entry in table.split(",") if entry.strip()]
+
+
+@pytest.mark.parametrize("lut", [integral_lut(), build_lut("KTY81-110")],
+                         ids=["integral", "KTY81-110"])
+def test_float_literals(lut):
+    entries = table_entries(lut.c_code())
+    assert len(entries) == len(lut.table)
+    for entry, value in zip(entries, lut.table):
+        assert C_FLOAT.fullmatch(entry), entry
+        assert float(entry[:-1]) == value
+
+
+@pytest.mark.skipif(shutil.which("cc") is None, reason="No C compiler")
+@pytest.mark.parametrize("frac_bits", [None, 4])
+def test_c_code_compiles(tmp_path, frac_bits):
+    source = tmp_path / "lut.c"
+    lut = integral_lut() if frac_bits is None else build_lut(frac_bits=4)
+    source.write_text("#include <stdint.h>\n" + lut.c_code())
+    subprocess.run(["cc", "-std=c99", "-Wall", "-Werror", "-c", str(source),
+                    "-o", str(tmp_path / "lut.o")], check=True)
+
+
+@pytest.mark.skipif(shutil.which("cc") is None, reason="No C compiler")
+@pytest.mark.parametrize("adc_bits, frac_bits", [(12, None), (12, 4),
+                                                 (None, None), (None, 6)])
+def test_c_code_same_as_python(tmp_path, adc_bits, frac_bits):
+    lut = build_lut("KTY81-121", adc_bits=adc_bits, frac_bits=frac_bits)
+    x_end = lut.x_start + lut.x_step * (len(lut.table) - 1)
+    if adc_bits is None:
+        x = np.linspace(lut.x_start - 50, x_end + 50, 1001)
+        arg_type, arg_format = "float", "%.9g"
+    else:
+        x = np.arange(lut.x_start - 20, x_end + 20)
+        arg_type, arg_format = "uint32_t", "%d"
+    result_format = "%.9g" if frac_bits is None else "%d"
+    cast = "(double)" if frac_bits is None else "(int)"
+    args = ", ".join((arg_format % value) + ("f" if adc_bits is None else "u")
+                     for value in x)
+    source = tmp_path / "lut.c"
+    source.write_text(
+        "#include <stdint.h>\n#include <stdio.h>\n" + lut.c_code()
+        + f"static const {arg_type} args[] = {{{args}}};\n"
+        "int main(void)\n{\n"
+        f"    for (unsigned i = 0; i < {len(x)}; i++)\n"
+        f'        printf("{result_format}\\n", '
+        f"{cast}kty81_121_temperature(args[i]));\n"
+        "    return 0;\n}\n")
+    executable = str(tmp_path / "lut")
+    subprocess.run(["cc", "-std=c99", "-Wall", "-Werror", str(source),
+                    "-o", executable], check=True)
+    output = subprocess.run([executable], check=True, capture_output=True,
+                            text=True).stdout
+    result = np.array(output.split(), dtype=float)
+    if frac_bits is not None:
+        result /= 2**frac_bits
+    expected = lut(x.astype(np.float32).astype(float)
+                   if adc_bits is None else x)
+    if adc_bits is not None and frac_bits is not None:
+        # Integer arithmetic is reproduced exactly
+        np.testing.assert_array_equal(result, expected)
+    else:
+        # Single precision, and truncation of the fixed-point result
+        atol = 1e-3 if frac_bits is None else 1.01 / 2**frac_bits
+        np.testing.assert_allclose(result, expected, rtol=0, atol=atol)
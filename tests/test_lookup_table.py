@@ -0,0 +1,95 @@
+import math
+import numpy as np
+import pytest
+
+from upylib.phys_chem.lookup_table import UniformTable
+from upylib.phys_chem.water_glycol_density_c_th import (
+    C_TH_GLYKOL60_REF, C_TH_GLYKOL60_T, C_TH_WATER_REF, C_TH_WATER_T,
+    RHO_GLYKOL60_REF, RHO_GLYKOL60_T, c_th_glykol60, c_th_water,
+    property_table, rho_glykol60, rho_water)
+
+REFERENCE_GRIDS = [(C_TH_WATER_T, C_TH_WATER_REF),
+                   (RHO_GLYKOL60_T, RHO_GLYKOL60_REF),
+                   (C_TH_GLYKOL60_T, C_TH_GLYKOL60_REF)]
+
+
+@pytest.mark.parametrize("x_ref, y_ref", REFERENCE_GRIDS)
+def test_same_as_interp_on_reference_grids(x_ref, y_ref):
+    table = UniformTable.from_points(x_ref, y_ref)
+    x = np.linspace(x_ref[0] - 5, x_ref[-1] + 5, 10001)
+    expected = np.interp(x, x_ref, y_ref)
+    np.testing.assert_allclose(table(x), expected, rtol=1e-15)
+    # Python floats take the scalar path
+    for value, y in zip(x[::50].tolist(), expected[::50]):
+        result = table(value)
+        assert isinstance(result, float)
+        assert result == pytest.approx(y, rel=1e-15)
+    np.testing.assert_array_equal(table(x_ref), y_ref)
+
+
+def test_bounds_policies():
+    tables = {bounds: UniformTable(0.0, 0.5, [1.0, 2.0, 4.0], bounds)
+              for bounds in ("clip", "nan", "raise")}
+    inside = np.array([0.0, 0.25, 0.75, 1.0])
+    for table in tables.values():
+        np.testing.assert_array_equal(table(inside), [1.0, 1.5, 3.0, 4.0])
+        assert table(1) == 4.0
+    assert math.isnan(tables["clip"](math.nan))
+    assert math.isnan(tables["nan"](math.nan))
+    x = np.array([-1.0, 0.5, 2.0])
+    np.testing.assert_array_equal(tables["clip"](x), [1.0, 2.0, 4.0])
+    assert tables["clip"](-1.0) == 1.0 and tables["clip"](2) == 4.0
+    np.testing.assert_array_equal(tables["nan"](x), [np.nan, 2.0, np.nan])
+    assert math.isnan(tables["nan"](2.0))
+    with pytest.raises(ValueError):
+        tables["raise"](x)
+    with pytest.raises(ValueError):
+        tables["raise"](-0.1)
+    with pytest.raises(ValueError):
+        tables["raise"](math.nan)
+    np.testing.assert_array_equal(tables["clip"](np.array([np.nan, 3.0])),
+                                  [np.nan, 4.0])
+    with pytest.raises(AssertionError):
+        UniformTable(0.0, 1.0, [1.0, 2.0], "extrapolate")
+
+
+def test_from_function_and_points_with_step():
+    table = UniformTable.from_function(np.square, 0.0, 1.0, 0.3)
+    assert table.x_end == pytest.approx(1.2)
+    assert table(0.6) == pytest.approx(0.36)
+    resampled = UniformTable.from_points([0.0, 1.0, 3.0], [0.0, 1.0, 5.0],
+                                         x_step=0.5)
+    np.testing.assert_allclose(resampled(np.array([0.5, 2.0, 2.5])),
+                               [0.5, 3.0, 4.0])
+    with pytest.raises(AssertionError):
+        UniformTable.from_points([0.0, 1.0, 3.0], [0.0, 1.0, 5.0])
+
+
+def test_property_tables_of_base_concentrations():
+    theta = np.linspace(0.0, 100.0, 1001)
+    np.testing.assert_allclose(property_table("rho")(theta),
+                               rho_water(theta), rtol=1e-7)
+    np.testing.assert_allclose(property_table("c_th")(theta),
+                               c_th_water(theta), rtol=1e-15)
+    theta = np.linspace(-40.0, 105.0, 1001)
+    np.testing.assert_allclose(property_table("rho", 60)(theta),
+                               rho_glykol60(theta), rtol=1e-15)
+    np.testing.assert_allclose(property_table("c_th", 60)(theta),
+                               c_th_glykol60(theta), rtol=1e-15)
+    assert property_table("rho", 60) is property_table("rho", 60)
+    with pytest.raises(ValueError):
+        property_table("rho", 70)
+
+
+@pytest.mark.parametrize("vol_percent", [15, 30, 45])
+def test_property_tables_between_concentrations(vol_percent):
+    weight = vol_percent / 60
+    for prop, water, glycol in (("rho", rho_water, rho_glykol60),
+                                ("c_th", c_th_water, c_th_glykol60)):
+        table = property_table(prop, vol_percent, bounds="nan")
+        # Common temperature range of water and the 60% mixture
+        assert (table.x_start, table.x_end) == (0.0, 100.0)
+        theta = np.linspace(0.0, 100.0, 501)
+        expected = (1 - weight) * water(theta) + weight * glycol(theta)
+        np.testing.assert_allclose(table(theta), expected, rtol=1e-7)
+        assert np.isnan(table(-10.0))
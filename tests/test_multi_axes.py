@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+matplotlib = pytest.importorskip("matplotlib")
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from upylib.plot_utils.multi_axes import LivePlot3Axes
+
+
+def headless_live_plot(window_length):
+    """LivePlot3Axes on an Agg canvas, counting the full redraws"""
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    live = LivePlot3Axes(window_length, figure=figure)
+    live.draws = 0
+    def count(_event):
+        live.draws += 1
+    figure.canvas.mpl_connect("draw_event", count)
+    return live
+
+
+def test_blitting_redraws_only_on_changes():
+    live = headless_live_plot(1000)
+    t = np.arange(100.0)
+    live.append(t, np.sin(t), np.cos(t), 10.0)
+    live.update()
+    assert live.draws == 1
+    for line, values in zip(live.lines, (np.sin(t), np.cos(t), 10.0)):
+        x, y = line.get_data()
+        np.testing.assert_array_equal(x, t)
+        np.testing.assert_array_equal(y, np.broadcast_to(values, t.shape))
+    # Within the current limits, only the lines are blitted
+    for i in range(100, 110):
+        live.append(float(i), 0.5, -0.5, 10.0)
+        live.update()
+    assert live.draws == 1
+    x, y = live.lines[0].get_data()
+    assert x[-1] == 109.0 and y[-1] == 0.5
+    # X-axis advances
+    live.append(np.arange(110.0, 200.0), 0.0, 0.0, 10.0)
+    live.update()
+    assert live.draws == 2
+    assert live.host_ax.get_xlim()[1] >= 199.0
+    # Y-axis expands
+    live.append(200.0, 5.0, 0.0, 10.0)
+    live.update()
+    assert live.draws == 3
+    assert live.host_ax.get_ylim()[1] >= 5.0
+    live.update()
+    assert live.draws == 3
+    live.figure.set_size_inches(12, 6)
+    live.update()
+    assert live.draws == 4
+    live.update()
+    assert live.draws == 4
+
+
+def test_long_window_is_decimated():
+    n = 50_000
+    live = headless_live_plot(n)
+    t = np.arange(2 * n, dtype=float)
+    y = np.zeros(2 * n)
+    y[-1234] = 7.0
+    live.append(t, y, -y, y)
+    live.update()
+    n_buckets = int(live.host_ax.get_window_extent().width)
+    x, values = live.lines[0].get_data()
+    assert len(x) == 2 * n_buckets
+    assert x[0] == n and values.max() == 7.0
+    assert live.lines[1].get_data()[1].min() == -7.0
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from upylib.phys_chem.parameter_sweep import sweep, load_sweep, pipe_loss_model
+from upylib.phys_chem.pressure_loss import pipe_delta_p_mbar, viscosity_water_20
+from upylib.phys_chem.water_glycol_density_c_th import property_table
+
+
+def test_pipe_loss_sweep(tmp_path, caplog):
+    grid = {"Di_mm": [10.0, 20.0], "Q_l_min": [2.0, 8.0, 20.0],
+            "theta": [-20.0, 20.0, 60.0], "vol_percent": [0, 40]}
+    result = sweep(pipe_loss_model, str(tmp_path), chunk_size=5, workers=0,
+                   **grid)
+    # NaN out of range is not reported as an implausible Reynolds number
+    assert not [r for r in caplog.records if r.levelname == "WARNING"]
+    assert result["complete"]
+    delta_p = result["delta_p_mbar"]
+    assert delta_p.shape == (2, 3, 3, 2)
+    # Water below 0°C is outside of the property table
+    assert np.isnan(delta_p[:, :, 0, 0]).all()
+    assert np.isfinite(delta_p[:, :, 1:, :]).all()
+    rho = 1000 * property_table("rho", 0)(20.0)
+    assert delta_p[1, 2, 1, 0] == pytest.approx(pipe_delta_p_mbar(
+        1.0, 20.0, 20.0, 0.0015, rho, viscosity_water_20), rel=1e-12)
+
+
+def test_resume_only_evaluates_missing_chunks(tmp_path):
+    grid = {"Di_mm": [10.0, 20.0, 30.0], "Q_l_min": [2.0, 8.0],
+            "theta": [20.0, 40.0]}
+    sweep(pipe_loss_model, str(tmp_path), chunk_size=4, workers=0, **grid)
+    done = np.load(tmp_path / "chunks_done.npy", mmap_mode="r+")
+    done[1] = 0
+    done.flush()
+    out = load_sweep(str(tmp_path), mode="r+")
+    expected = np.array(out["delta_p_mbar"])
+    out["delta_p_mbar"].reshape(-1)[:] = -1.0
+    out["delta_p_mbar"].flush()
+    del out
+    result = sweep(pipe_loss_model, str(tmp_path), chunk_size=4, workers=0,
+                   **grid)
+    flat = np.asarray(result["delta_p_mbar"]).reshape(-1)
+    np.testing.assert_array_equal(flat[4:8], expected.reshape(-1)[4:8])
+    assert (np.delete(flat, range(4, 8)) == -1.0).all()
+    with pytest.raises(ValueError):
+        sweep(pipe_loss_model, str(tmp_path), chunk_size=2, workers=0,
+              **grid)
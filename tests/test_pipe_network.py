@@ -0,0 +1,105 @@
+import math
+import numpy as np
+import pytest
+
+from upylib.phys_chem.pipe_network import PipeNetwork
+from upylib.phys_chem.pressure_loss import pipe_delta_p_mbar
+
+RHO = 1000.0
+
+
+def node_balance(net):
+    """Net flow out of each node through the segments, in l/min"""
+    balance = np.zeros(len(net.nodes))
+    np.add.at(balance, net._node_from, net.Q_l_min)
+    np.add.at(balance, net._node_to, -net.Q_l_min)
+    return balance
+
+
+def test_laminar_loop_hand_solved():
+    """Pump, pipe, two parallel pipes and return pipe. For laminar flow,
+    each pipe is a linear resistance 128 * viscosity * l / (pi * Di^4)"""
+    viscosity = 0.5
+    net = PipeNetwork()
+    pipes = [("supply", "a", 2.0, 25.0), ("a", "b", 5.0, 16.0),
+             ("a", "b", 8.0, 20.0), ("b", "return", 2.0, 25.0)]
+    for node_from, node_to, l_m, Di_mm in pipes:
+        net.add_segment(node_from, node_to, l_m=l_m, Di_mm=Di_mm)
+    net.add_segment("return", "supply", l_m=0, Di_mm=25, dp_pump_mbar=250)
+    net.set_pressure("return", 1000)
+    Q_l_min, p_mbar = net.solve(RHO, viscosity)
+
+    R1, R2, R3, R4 = (128 * viscosity * l_m / (math.pi * (Di_mm / 1000)**4)
+                      for _, _, l_m, Di_mm in pipes)
+    R_parallel = 1 / (1 / R2 + 1 / R3)
+    # Total loss in Pa equals the pump pressure
+    Q = 250e2 / (R1 + R_parallel + R4)
+    dp_parallel = Q * R_parallel
+    expected_Q = np.array([Q, dp_parallel / R2, dp_parallel / R3, Q, Q]) * 60e3
+    np.testing.assert_allclose(Q_l_min, expected_Q, rtol=1e-8)
+    pressures = net.pressures()
+    np.testing.assert_allclose(
+        [pressures["supply"], pressures["a"], pressures["b"]],
+        np.array([1000e2 + 250e2, 1000e2 + 250e2 - Q * R1,
+                  1000e2 + Q * R4]) / 100, rtol=1e-10)
+    np.testing.assert_allclose(node_balance(net), 0, atol=1e-9)
+
+
+def test_turbulent_loop_matches_pipe_delta_p():
+    viscosity = 1.0e-3
+    net = PipeNetwork()
+    net.add_segment("supply", "a", l_m=10, Di_mm=20)
+    net.add_segment("a", "return", l_m=4, Di_mm=16)
+    net.add_segment("return", "supply", l_m=0, Di_mm=20, dp_pump_mbar=300)
+    net.set_pressure("return", 0)
+    Q_l_min, _ = net.solve(RHO, viscosity)
+    Q = Q_l_min[0]
+    np.testing.assert_allclose(Q_l_min, Q, rtol=1e-10)
+    delta_p = (pipe_delta_p_mbar(10, 20, Q, 0.0015, RHO, viscosity)
+               + pipe_delta_p_mbar(4, 16, Q, 0.0015, RHO, viscosity))
+    # Reynolds number well above the interpolated transition range
+    assert Q / 60e3 / (math.pi / 4 * 0.016**2) * RHO * 0.016 / viscosity > 1e4
+    assert delta_p == pytest.approx(300, rel=1e-8)
+
+
+def test_grid_mass_balance_with_inflows():
+    rng = np.random.default_rng(0)
+    size = 6
+    net = PipeNetwork()
+    for i in range(size):
+        for j in range(size):
+            if i + 1 < size:
+                net.add_segment((i, j), (i + 1, j), l_m=rng.uniform(1, 5),
+                                Di_mm=rng.uniform(10, 30), zeta=1.0)
+            if j + 1 < size:
+                net.add_segment((i, j), (i, j + 1), l_m=rng.uniform(1, 5),
+                                Di_mm=rng.uniform(10, 30), zeta=1.0)
+    net.set_pressure((0, 0), 2000)
+    inflows = {(size - 1, size - 1): -30.0, (0, size - 1): -12.0,
+               (size - 1, 0): 2.0}
+    for node, Q_l_min in inflows.items():
+        net.set_inflow(node, Q_l_min)
+    net.solve()
+    balance = node_balance(net)
+    for node, index in net.nodes.items():
+        if node != (0, 0):
+            assert balance[index] == pytest.approx(inflows.get(node, 0.0),
+                                                   abs=1e-9)
+    # The fixed pressure node supplies the net outflow
+    assert balance[net.nodes[(0, 0)]] == pytest.approx(40.0, rel=1e-9)
+    # Warm start from the solution converges in one step
+    Q_l_min = net.Q_l_min.copy()
+    net.solve()
+    assert net.iterations == 1
+    np.testing.assert_allclose(net.Q_l_min, Q_l_min, rtol=1e-9, atol=1e-12)
+
+
+def test_max_iter():
+    net = PipeNetwork()
+    net.add_segment("supply", "return", l_m=10, Di_mm=20)
+    net.add_segment("return", "supply", l_m=0, Di_mm=20, dp_pump_mbar=300)
+    net.set_pressure("return", 0)
+    with pytest.raises(ValueError):
+        net.solve(max_iter=0)
+    Q_l_min, _ = net.solve(max_iter=1)
+    assert net.iterations == 1 and np.isfinite(Q_l_min).all()
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from upylib.phys_chem.pressure_loss import pipe_friction_lambda
+
+
+def reynolds_sweep(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return 10**rng.uniform(2, 7, n), 10**rng.uniform(-6, -1.5, n)
+
+
+def test_colebrook_white_residual():
+    Re, eD = reynolds_sweep(10_000)
+    friction_lambda = pipe_friction_lambda(Re, eD)
+    turbulent = Re >= 2300
+    np.testing.assert_allclose(friction_lambda[~turbulent],
+                               64 / Re[~turbulent])
+    inv_sqrt = 1 / np.sqrt(friction_lambda[turbulent])
+    residual = inv_sqrt + 2 * np.log10(
+        eD[turbulent] / 3.71 + 2.51 / Re[turbulent] * inv_sqrt)
+    assert np.max(np.abs(residual / inv_sqrt)) < 1e-10
+
+
+@pytest.mark.parametrize("max_iter", [0, 1, 1000])
+def test_scalar_path_matches_array_path(max_iter):
+    Re, eD = reynolds_sweep(1000, seed=1)
+    lambdas, iterations = pipe_friction_lambda(
+        Re, eD, max_iter=max_iter, return_iterations=True)
+    for i in range(len(Re)):
+        scalar, scalar_iterations = pipe_friction_lambda(
+            float(Re[i]), float(eD[i]), max_iter=max_iter,
+            return_iterations=True)
+        assert isinstance(scalar, float)
+        assert scalar == pytest.approx(lambdas[i], rel=1e-14)
+        assert scalar_iterations == iterations[i]
+
+
+def test_non_positive_reynolds_number():
+    assert np.isnan(pipe_friction_lambda(0.0, 1e-4))
+    assert np.isnan(pipe_friction_lambda(np.array([-1.0]), 1e-4)[0])
+
+
+def test_implausible_and_nan_reynolds_numbers(caplog):
+    Re = np.array([np.nan, 5000.0, -1.0, 0.0])
+    result = pipe_friction_lambda(Re, 1e-3)
+    assert np.isnan(result[[0, 2, 3]]).all() and result[1] > 0
+    warnings = [r.getMessage() for r in caplog.records
+                if r.levelname == "WARNING"]
+    assert warnings == ["Reynolds number <= 0 for 2 elements, "
+                        "this is not plausible"]
+    caplog.clear()
+    assert np.isnan(pipe_friction_lambda(np.nan, 1e-3))
+    assert np.isnan(pipe_friction_lambda(float("nan"), 1e-3))
+    assert not caplog.records
+
+
+def test_reference_value():
+    expected = 0.02511292846918426
+    assert pipe_friction_lambda(25378.248080428664, 0.007/25) == (
+        pytest.approx(expected, rel=1e-12))
+    assert pipe_friction_lambda(np.array([25378.248080428664]), 0.007/25)[0] \
+        == pytest.approx(expected, rel=1e-12)
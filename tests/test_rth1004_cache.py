@@ -0,0 +1,76 @@
+import json
+import os
+import numpy as np
+import pytest
+
+from upylib.devices import rth1004
+from upylib.devices.rth1004 import RTH1004_DATA, cache_filenames
+from conftest import write_capture
+
+
+def assert_same_capture(a: RTH1004_DATA, b: RTH1004_DATA):
+    for name in RTH1004_DATA.header_attributes:
+        assert getattr(a, name) == getattr(b, name), name
+    assert a.t_0 == b.t_0
+    np.testing.assert_array_equal(a.time, b.time)
+    np.testing.assert_array_equal(a.chs, b.chs)
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+@pytest.mark.parametrize("implicit_time", [False, True])
+def test_cache_matches_csv(capture_csv, columnar, implicit_time):
+    parsed = RTH1004_DATA(capture_csv, False, columnar, implicit_time)
+    written = RTH1004_DATA(capture_csv, True, columnar, implicit_time)
+    cached = RTH1004_DATA(capture_csv, True, columnar, implicit_time)
+    assert not isinstance(written.samples_raw, np.memmap)
+    assert isinstance(cached.samples_raw, np.memmap)
+    assert_same_capture(parsed, written)
+    assert_same_capture(parsed, cached)
+    # The first rows are those of the real capture
+    np.testing.assert_array_equal(
+        cached.chs[:, :2], [[16.9216, 16.7647], [0.529412, 0.45098],
+                            [5.4902, 5.4902], [0.411765, 0.411765]])
+
+
+def test_cache_other_layout_is_rewritten(capture_csv):
+    RTH1004_DATA(capture_csv, True)
+    columnar = RTH1004_DATA(capture_csv, True, columnar=True)
+    assert not isinstance(columnar.samples_raw, np.memmap)
+    assert columnar.samples_raw.flags.f_contiguous
+    assert isinstance(RTH1004_DATA(capture_csv, True, columnar=True)
+                      .samples_raw, np.memmap)
+
+
+def test_stale_cache_is_ignored(capture_csv):
+    RTH1004_DATA(capture_csv, True)
+    write_capture(capture_csv, record_length=3000, seed=1)
+    reparsed = RTH1004_DATA(capture_csv, True)
+    assert not isinstance(reparsed.samples_raw, np.memmap)
+    assert_same_capture(reparsed, RTH1004_DATA(capture_csv))
+
+
+@pytest.mark.parametrize("damage", ["attributes", "t_0", "garbage"])
+def test_damaged_cache_is_ignored(capture_csv, damage):
+    RTH1004_DATA(capture_csv, True)
+    _, json_file = cache_filenames(capture_csv)
+    if damage == "garbage":
+        with open(json_file, "wt") as f:
+            f.write("{")
+    else:
+        with open(json_file, "rt") as f:
+            cache_header = json.load(f)
+        del cache_header[damage]
+        with open(json_file, "wt") as f:
+            json.dump(cache_header, f)
+    capture = RTH1004_DATA(capture_csv, True)
+    assert not isinstance(capture.samples_raw, np.memmap)
+    assert_same_capture(capture, RTH1004_DATA(capture_csv))
+
+
+def test_cache_write_failure(capture_csv, monkeypatch):
+    def read_only(*args, **kwargs):
+        raise PermissionError(13, "Read-only file system")
+    monkeypatch.setattr(rth1004.np, "save", read_only)
+    capture = RTH1004_DATA(capture_csv, True)
+    assert_same_capture(capture, RTH1004_DATA(capture_csv))
+    assert os.listdir(os.path.dirname(capture_csv)) == ["capture.csv"]
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from upylib.devices.rth1004 import RTH1004_DATA
+
+
+def load_chunked(filename, loaded, implicit_time):
+    capture = RTH1004_DATA()
+    if loaded:
+        capture.read_csv(filename, implicit_time=implicit_time)
+    else:
+        capture.read_header(filename, implicit_time)
+    return capture
+
+
+@pytest.mark.parametrize("loaded", [True, False])
+@pytest.mark.parametrize("implicit_time", [False, True])
+@pytest.mark.parametrize("chunk_size, overlap", [(1000, 0), (777, 16),
+                                                 (5000, 3), (6000, 20)])
+def test_chunks_cover_capture(capture_csv, loaded, implicit_time,
+                              chunk_size, overlap):
+    full = RTH1004_DATA(capture_csv, implicit_time=implicit_time)
+    capture = load_chunked(capture_csv, loaded, implicit_time)
+    chunks = list(capture.iter_chunks(chunk_size, overlap))
+    assert len(chunks) == -(-full.record_length // chunk_size)
+    np.testing.assert_array_equal(
+        np.concatenate([chunk.core(chunk.chs) for chunk in chunks], axis=1),
+        full.chs)
+    np.testing.assert_allclose(
+        np.concatenate([chunk.core(chunk.time) for chunk in chunks]),
+        full.time, rtol=0, atol=1e-15)
+    for chunk in chunks:
+        assert chunk.block_start == max(chunk.core_start - overlap, 0)
+        np.testing.assert_array_equal(
+            chunk.chs, full.chs[:, chunk.block_start:
+                                   chunk.block_start + chunk.record_length])
+
+
+@pytest.mark.parametrize("loaded", [True, False])
+def test_chunked_processing_matches_full(capture_csv, loaded):
+    filter_avg = 31
+    full = RTH1004_DATA(capture_csv)
+    derivative = full.do_time_derivative(full.ch4, filter_avg)
+    integral = full.do_time_integral(full.ch4)
+    capture = load_chunked(capture_csv, loaded, False)
+    chunk_derivatives, chunk_integrals = [], []
+    last = 0.0
+    for chunk in capture.iter_chunks(1200, overlap=filter_avg // 2 + 1):
+        chunk_derivatives.append(
+            chunk.core(chunk.do_time_derivative(chunk.ch4, filter_avg)))
+        chunk_integrals.append(
+            chunk.do_time_integral(chunk.core(chunk.ch4), last))
+        last = chunk_integrals[-1][-1]
+    np.testing.assert_allclose(np.concatenate(chunk_derivatives), derivative,
+                               rtol=1e-9, atol=1e-3)
+    np.testing.assert_allclose(np.concatenate(chunk_integrals), integral,
+                               rtol=1e-12, atol=1e-18)
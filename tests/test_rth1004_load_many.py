@@ -0,0 +1,47 @@
+import os
+import numpy as np
+import pytest
+
+from upylib.devices import rth1004
+from upylib.devices.rth1004 import RTH1004_DATA, load_many
+from conftest import write_capture
+
+
+@pytest.fixture
+def capture_csvs(tmp_path):
+    filenames = [str(tmp_path / f"capture_{i}.csv") for i in range(3)]
+    for seed, filename in enumerate(filenames):
+        write_capture(filename, record_length=2000, seed=seed)
+    return filenames
+
+
+def assert_loaded(captures, filenames):
+    assert [capture.filename for capture in captures] == filenames
+    for capture, filename in zip(captures, filenames):
+        np.testing.assert_array_equal(capture.samples_raw,
+                                      RTH1004_DATA(filename).samples_raw)
+        assert capture.idx_end == capture.record_length - 1
+
+
+def test_load_many_cached(capture_csvs):
+    captures = load_many(capture_csvs, workers=2)
+    assert_loaded(captures, capture_csvs)
+    assert all(isinstance(capture.samples_raw, np.memmap)
+               for capture in captures)
+
+
+def test_load_many_without_cache(capture_csvs):
+    captures = load_many(capture_csvs, workers=2, cache=False)
+    assert_loaded(captures, capture_csvs)
+    assert sorted(os.listdir(os.path.dirname(capture_csvs[0]))) == [
+        os.path.basename(filename) for filename in capture_csvs]
+
+
+def test_load_many_cache_not_writable(capture_csvs, monkeypatch):
+    def read_only(*args, **kwargs):
+        raise PermissionError(13, "Read-only file system")
+    # Also applies to the worker processes if they are forked
+    monkeypatch.setattr(rth1004.np, "save", read_only)
+    captures = load_many(capture_csvs, workers=2, columnar=True)
+    assert_loaded(captures, capture_csvs)
+    assert all(capture.samples_raw.flags.f_contiguous for capture in captures)
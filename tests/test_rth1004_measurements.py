@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from upylib.devices.rth1004 import RTH1004_DATA
+
+
+@pytest.mark.parametrize("implicit_time", [False, True])
+def test_edges_of_zoomed_samples(capture_csv, implicit_time):
+    capture = RTH1004_DATA(capture_csv, implicit_time=implicit_time)
+    levels = (1.0, 17.0)
+    full = capture.measure_edges(capture.ch1, 5.0, 12.0, levels)
+    capture.set_viewport(-2.3e-6, 0.0)
+    zoomed = capture.measure_edges(capture.ch1_zoomed, 5.0, 12.0, levels,
+                                   capture.idx_start)
+    assert 0 < len(zoomed["t_start"]) < len(full["t_start"])
+    inside = np.isin(full["t_start"], zoomed["t_start"])
+    assert np.count_nonzero(inside) == len(zoomed["t_start"])
+    np.testing.assert_allclose(zoomed["t_end"], full["t_end"][inside],
+                               rtol=0, atol=1e-15)
+    assert np.all((zoomed["t_start"] >= -2.3e-6) & (zoomed["t_end"] <= 0.0))
+
+
+def test_switching_energy_of_zoomed_samples(capture_csv):
+    capture = RTH1004_DATA(capture_csv)
+    windows = [(-2.2e-6, -1.9e-6), (-1.5e-6, -1.1e-6)]
+    full = capture.switching_energy(capture.ch1, capture.ch4, windows)
+    capture.set_viewport(-2.3e-6, -1e-6)
+    zoomed = capture.switching_energy(capture.ch1_zoomed, capture.ch4_zoomed,
+                                      windows, capture.idx_start)
+    np.testing.assert_allclose(zoomed, full, rtol=1e-12)
+
+
+def test_switching_energy_of_viewport(capture_csv):
+    capture = RTH1004_DATA(capture_csv)
+    capture.set_viewport(-2.3e-6, -1e-6)
+    zoomed = capture.switching_energy(capture.ch1_zoomed, capture.ch4_zoomed,
+                                      idx_start=capture.idx_start)
+    full = capture.switching_energy(capture.ch1, capture.ch4)
+    power = capture.ch1_zoomed * capture.ch4_zoomed
+    np.testing.assert_allclose(zoomed, full, rtol=1e-12)
+    np.testing.assert_allclose(zoomed, [power.sum() * capture.sample_interval],
+                               rtol=1e-12)
+
+
+def test_switching_energy_of_overhanging_windows(capture_csv):
+    capture = RTH1004_DATA(capture_csv)
+    capture.set_viewport(-2.3e-6, -1e-6)
+    power = capture.ch1_zoomed * capture.ch4_zoomed
+    # Before, across the start, across the end and after the viewport
+    windows = [(-3e-6, -2.5e-6), (-3e-6, -2e-6), (-1.2e-6, 0.0), (-0.5e-6, 0.0)]
+    energy = capture.switching_energy(capture.ch1_zoomed, capture.ch4_zoomed,
+                                      windows, capture.idx_start)
+    idx_starts, idx_ends = capture.window_indices(windows)
+    expected = [power[max(start - capture.idx_start, 0):
+                      max(end - capture.idx_start, 0)].sum()
+                * capture.sample_interval
+                for start, end in zip(idx_starts, idx_ends)]
+    assert np.isnan(energy[[0, 3]]).all()
+    np.testing.assert_allclose(energy[1:3], expected[1:3], rtol=1e-12)
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from upylib.devices.rth1004 import RTH1004_DATA, RTH1004_SEGMENTS
+from conftest import write_capture
+
+
+@pytest.fixture
+def captures(tmp_path):
+    filenames = [str(tmp_path / f"hist_{i}.csv") for i in range(3)]
+    for seed, filename in enumerate(filenames):
+        write_capture(filename, record_length=2000, seed=seed)
+    return [RTH1004_DATA(filename) for filename in filenames]
+
+
+def test_segments_from_sequence_and_iterator(captures):
+    from_list = RTH1004_SEGMENTS(captures)
+    from_iter = RTH1004_SEGMENTS(iter(captures), len(captures))
+    assert from_list.n_segments == 3
+    np.testing.assert_array_equal(from_list.segments, from_iter.segments)
+    for capture, segment in zip(captures, from_iter.segments):
+        np.testing.assert_array_equal(segment, capture.chs)
+    assert from_iter.filenames == [c.filename for c in captures]
+
+
+@pytest.mark.parametrize("n_given", [0, 2, 4])
+def test_iterator_length_mismatch(captures, n_given):
+    given = (captures * 2)[:n_given]
+    with pytest.raises(ValueError):
+        RTH1004_SEGMENTS(iter(given), 3)
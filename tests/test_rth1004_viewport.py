@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from upylib.devices.rth1004 import RTH1004_DATA
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_zoomed_properties_are_views(capture_csv, columnar):
+    capture = RTH1004_DATA(capture_csv, columnar=columnar)
+    capture.set_viewport(-2e-6, -1e-6)
+    start, end = capture.idx_start, capture.idx_end
+    assert capture.time[start] >= -2e-6 > capture.time[start - 1]
+    assert capture.time[end] <= -1e-6 < capture.time[end + 1]
+    for ch in range(1, 5):
+        zoomed = getattr(capture, f"ch{ch}_zoomed")
+        assert np.shares_memory(zoomed, capture.samples_raw)
+        assert zoomed.flags.c_contiguous == columnar
+        np.testing.assert_array_equal(zoomed, capture.chs[ch - 1, start:end])
+    assert np.shares_memory(capture.chs_zoomed, capture.samples_raw)
+    # Writes reach samples_raw, changes of samples_raw are visible
+    capture.ch2_zoomed[0] = 123.0
+    assert capture.ch2[start] == 123.0
+    capture.samples_raw[start + 1, capture._ch_column + 1] = 456.0
+    assert capture.chs_zoomed[1, 1] == 456.0
+    capture.set_viewport()
+    assert len(capture.ch1_zoomed) == capture.record_length - 1
@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+
+from upylib.devices import waveform_processing
+from upylib.devices.rth1004 import RTH1004_DATA
+from upylib.devices.waveform_processing import process_channels
+
+
+def one_at_a_time(capture, samples, filter_avg):
+    """Results of the RTH1004_DATA methods, see process_channels()"""
+    filtered = np.array([capture.filter_average(ch, filter_avg)
+                         if filter_avg > 1 else ch for ch in samples])
+    derivative = np.array([capture.do_time_derivative(ch, filter_avg)
+                           for ch in samples])
+    integral = np.array([capture.do_time_integral(ch) for ch in samples])
+    return np.array((filtered, derivative, integral))
+
+
+def assert_close_to_scale(actual, expected):
+    """Running sums differ from SciPy in the last digits of the largest
+    values, see process_channels()"""
+    for a, e in zip(actual, expected):
+        np.testing.assert_allclose(a, e, rtol=0,
+                                   atol=1e-12 * np.abs(e).max())
+
+
+@pytest.mark.parametrize("filter_avg", [1, 4, 31])
+def test_numpy_path_same_as_methods(capture_csv, filter_avg):
+    capture = RTH1004_DATA(capture_csv)
+    expected = one_at_a_time(capture, capture.chs, filter_avg)
+    out = np.full((3,) + capture.chs.shape, np.nan)
+    result = process_channels(capture.chs, capture.sample_interval,
+                              filter_avg, out=out, use_numba=False)
+    assert result is out
+    np.testing.assert_array_equal(result, expected)
+
+
+@pytest.mark.parametrize("filter_avg", [1, 4, 31])
+def test_kernel_same_as_methods(capture_csv, filter_avg):
+    capture = RTH1004_DATA(capture_csv)
+    samples = np.ascontiguousarray(capture.chs[:, :1500])
+    expected = one_at_a_time(capture, samples, filter_avg)
+    result = np.empty((3,) + samples.shape)
+    # Uncompiled Python version of the numba kernel
+    waveform_processing._fused_kernel(samples, filter_avg,
+                                      capture.sample_interval, *result)
+    assert_close_to_scale(result, expected)
+
+
+@pytest.mark.parametrize("filter_avg", [1, 4, 31])
+def test_numba_kernel_same_as_methods(capture_csv, filter_avg):
+    pytest.importorskip("numba")
+    capture = RTH1004_DATA(capture_csv)
+    expected = one_at_a_time(capture, capture.chs, filter_avg)
+    result = process_channels(capture.chs, capture.sample_interval,
+                              filter_avg, use_numba=True)
+    assert_close_to_scale(result, expected)
+
+
+def test_numba_required(capture_csv):
+    if waveform_processing.numba_available:
+        pytest.skip("numba is installed")
+    with pytest.raises(ImportError):
+        process_channels(np.zeros((1, 10)), 1.0, use_numba=True)
+
+
+def test_process_chs_of_viewport(capture_csv):
+    capture = RTH1004_DATA(capture_csv)
+    capture.set_viewport(-2e-6, 0.0)
+    result = capture.process_chs(8, zoomed=True)
+    assert result.shape == (3, 4, capture.idx_end - capture.idx_start)
+    expected = process_channels(capture.chs_zoomed, capture.sample_interval,
+                                8)
+    np.testing.assert_array_equal(result, expected)
+
+
+@pytest.fixture(scope="module")
+def spiky_waveform():
+    rng = np.random.default_rng(2)
+    samples = np.cumsum(rng.normal(size=300_000))
+    # Further apart than the buckets in the tests below
+    spikes = np.arange(0, len(samples), 10_000) + rng.integers(2000, 8000, 30)
+    samples[spikes[::2]] += 1e4
+    samples[spikes[1::2]] -= 1e4
+    return samples, spikes
+
+
+def test_minmax_pyramid(spiky_waveform):
+    samples, _ = spiky_waveform
+    pyramid = waveform_processing.minmax_pyramid(samples, 8, 1024)
+    for level, (mins, maxs) in enumerate(pyramid):
+        block_size = 8**(level + 1)
+        assert len(mins) == -(-len(samples) // block_size)
+        np.testing.assert_array_equal(mins[-1],
+                                      samples[-(len(samples) % block_size
+                                                or block_size):].min())
+        assert maxs.max() == samples.max() and mins.min() == samples.min()
+    assert len(pyramid[-1][0]) < 1024 <= len(pyramid[-2][0])
+
+
+@pytest.mark.parametrize("idx_start, idx_end, n_buckets", [
+    (0, 300_000, 1000), (12_345, 298_765, 700), (100_003, 140_001, 333),
+    (5, 9_000, 1000), (150_000, 152_001, 1000)])
+def test_minmax_decimate(spiky_waveform, idx_start, idx_end, n_buckets):
+    samples, spikes = spiky_waveform
+    pyramid = waveform_processing.minmax_pyramid(samples)
+    idx, values = waveform_processing.minmax_decimate(
+        samples, pyramid, idx_start, idx_end, n_buckets)
+    assert len(idx) == len(values) == 2 * n_buckets
+    assert np.all(np.diff(idx) >= 0)
+    assert idx_start <= idx[0] and idx[-1] < idx_end
+    # Each bucket holds the extremes of the samples up to the next one
+    bounds = np.append(idx[::2], idx_end)
+    pairs = values.reshape(-1, 2)
+    for i, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+        assert pairs[i].min() <= samples[start:end].min()
+        assert pairs[i].max() >= samples[start:end].max()
+    # All spikes in the range remain
+    for spike in spikes[(spikes >= idx_start) & (spikes < idx_end)]:
+        assert samples[spike] in values
+
+
+def test_minmax_decimate_passthrough(spiky_waveform):
+    samples, _ = spiky_waveform
+    pyramid = waveform_processing.minmax_pyramid(samples)
+    idx, values = waveform_processing.minmax_decimate(
+        samples, pyramid, 1000, 3000, 1000)
+    np.testing.assert_array_equal(idx, np.arange(1000, 3000))
+    np.testing.assert_array_equal(values, samples[1000:3000])
+    idx, values = waveform_processing.minmax_decimate(
+        samples, pyramid, 1000, 3001, 1000)
+    assert len(values) == 2000
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from upylib.devices.waveform_spectral import (
+    WINDOWS, amplitude_spectrum, fast_length, harmonics,
+    power_spectral_density, window)
+
+DT = 1e-6
+TIME = np.arange(10_000) * DT
+
+
+def is_fast(n):
+    for factor in (2, 3, 5):
+        while n % factor == 0:
+            n //= factor
+    return n == 1
+
+
+def test_fast_length_against_brute_force():
+    for n in range(1, 3000):
+        expected = next(m for m in range(n, 2 * n + 1) if is_fast(m))
+        assert fast_length(n) == expected, n
+    n = 2**20 + 1
+    assert fast_length(n) == next(m for m in range(n, 2 * n) if is_fast(m))
+
+
+@pytest.mark.parametrize("frequency", [12_345.6, 20_000.0, 33_333.3])
+def test_flattop_amplitude_of_sine(frequency):
+    samples = 0.5 + 3.0 * np.sin(2 * np.pi * frequency * TIME + 0.3)
+    freqs, spectrum = amplitude_spectrum(samples, DT, "flattop")
+    assert abs(freqs[np.argmax(spectrum)] - frequency) <= freqs[1]
+    assert spectrum.max() == pytest.approx(3.0, rel=1e-3)
+    assert spectrum[0] == pytest.approx(0.5, rel=1e-3)
+
+
+def test_batched_spectra_same_as_single():
+    rng = np.random.default_rng(0)
+    samples = rng.normal(size=(3, 2, 999))
+    freqs, spectra = amplitude_spectrum(samples, DT)
+    assert spectra.shape == (3, 2, fast_length(999) // 2 + 1)
+    np.testing.assert_allclose(spectra[2, 1],
+                               amplitude_spectrum(samples[2, 1], DT)[1])
+    assert amplitude_spectrum(samples, DT, pad=False)[1].shape[-1] == 500
+
+
+def test_white_noise_psd():
+    rng = np.random.default_rng(1)
+    sigma = 2.0
+    samples = rng.normal(0.0, sigma, (3, 100_000))
+    freqs, psd = power_spectral_density(samples, DT)
+    # One-sided white noise level and Parseval
+    np.testing.assert_allclose(psd.mean(axis=-1), 2 * sigma**2 * DT,
+                               rtol=0.02)
+    np.testing.assert_allclose(np.sum(psd, axis=-1) * freqs[1],
+                               samples.var(axis=-1), rtol=0.01)
+    with pytest.raises(ValueError):
+        power_spectral_density(samples, DT, segment_length=200_000)
+
+
+def test_thd_of_known_harmonics():
+    amplitudes = {1: 2.0, 2: 0.2, 3: 0.1, 5: 0.05}
+    samples = sum(a * np.sin(2 * np.pi * 1000.3 * k * TIME + k)
+                  for k, a in amplitudes.items())
+    result = harmonics(np.array([samples, 0.5 * samples]), DT,
+                       n_harmonics=6)
+    np.testing.assert_allclose(result["f_fundamental"], 1000.3, atol=1.0)
+    np.testing.assert_allclose(
+        result["amplitudes"][0],
+        [amplitudes.get(k, 0.0) for k in range(1, 7)], rtol=1e-3, atol=1e-4)
+    np.testing.assert_allclose(result["amplitudes"][1],
+                               0.5 * result["amplitudes"][0], rtol=1e-12)
+    thd = np.sqrt(0.2**2 + 0.1**2 + 0.05**2) / 2.0
+    np.testing.assert_allclose(result["thd"], thd, rtol=1e-3)
+    # Harmonics above the Nyquist frequency
+    fixed = harmonics(samples, DT, f_fundamental=100e3, n_harmonics=6)
+    assert np.isnan(fixed["amplitudes"][5:]).all()
+
+
+def test_window_functions():
+    for name in WINDOWS:
+        w = window(name, 64)
+        assert w.shape == (64,) and not w.flags.writeable
+        assert w.max() == pytest.approx(1.0, abs=1e-3)
+    with pytest.raises(ValueError):
+        window("kaiser", 64)
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from upylib.phys_chem.wheatstone_rtd_pt100_pt1000 import (
+    CVD_RANGE, bridge_temperature, cvd_resistance, cvd_table,
+    cvd_temperature, ptRTD_temperature, wheatstone)
+
+THETA = np.linspace(*CVD_RANGE, 4201)
+U0, NREF, RS1 = 2.5, 1.0, 1000.0
+
+
+def bridge_voltage(r_x):
+    """Inverse of wheatstone() for the bridge above"""
+    return U0 * (r_x * NREF - RS1) / (r_x + RS1)
+
+
+@pytest.mark.parametrize("func", [ptRTD_temperature, cvd_temperature])
+def test_mixed_sign_array_matches_scalar(func):
+    r_x = cvd_resistance(THETA)
+    assert (r_x < 1000).any() and (r_x > 1000).any()
+    expected = [func(r) for r in r_x.tolist()]
+    np.testing.assert_array_equal(func(r_x), expected)
+
+
+def test_cvd_round_trip():
+    r_x = cvd_resistance(THETA)
+    np.testing.assert_allclose(cvd_temperature(r_x), THETA, rtol=0,
+                               atol=1e-9)
+    # Fifth order correction of the quadratic equation
+    np.testing.assert_allclose(ptRTD_temperature(r_x), THETA, rtol=0,
+                               atol=1e-4)
+    np.testing.assert_allclose(cvd_resistance(0.0), 1000.0)
+    np.testing.assert_allclose(cvd_resistance(100.0, 100.0), 138.5055)
+
+
+def test_cvd_table():
+    table = cvd_table()
+    assert cvd_table() is table
+    np.testing.assert_allclose(table(cvd_resistance(THETA, 1.0)), THETA,
+                               rtol=0, atol=1e-6)
+    assert np.isnan(table(np.array([0.1, 4.0]))).all()
+    assert np.isnan(table(4.0))
+
+
+def test_bridge_methods_agree():
+    r_x = cvd_resistance(THETA)
+    ud = bridge_voltage(r_x)
+    np.testing.assert_allclose(wheatstone(ud, U0, NREF, RS1), r_x,
+                               rtol=1e-12)
+    exact = bridge_temperature(ud, U0, NREF, RS1, method="exact")
+    np.testing.assert_allclose(exact, THETA, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(
+        bridge_temperature(ud, U0, NREF, RS1, method="table"), exact,
+        rtol=0, atol=1e-6)
+    np.testing.assert_allclose(
+        bridge_temperature(ud, U0, NREF, RS1, method="fit"), exact,
+        rtol=0, atol=1e-4)
+    # The fit is the same as ptRTD_temperature()
+    np.testing.assert_allclose(
+        bridge_temperature(ud, U0, NREF, RS1), ptRTD_temperature(r_x),
+        rtol=1e-13, atol=1e-9)
+    for method in ("fit", "table", "exact"):
+        scalar = bridge_temperature(float(ud[0]), U0, NREF, RS1,
+                                    method=method)
+        assert np.ndim(scalar) == 0
+        assert scalar == pytest.approx(-200.0, abs=1e-4)
+    with pytest.raises(AssertionError):
+        bridge_temperature(ud, U0, NREF, RS1, method="spline")